@@ -0,0 +1,71 @@
+import os
+import sys
+# the benchmarks run the modules in src directly, like python ./src does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from runner import compare, row_name, run, run_scaling, save_report
+from solvers import ALGORITHMS
+
+import argparse
+import json
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description = "Benchmark parsing, simulation and all solvers on generated valleys of growing size.", usage="%(prog)s [options]")
+
+    argparser.add_argument("-s", "--sizes", type = str, default = "20x5,40x10,80x20,120x25", help = "Comma separated valley sizes as WIDTHxHEIGHT.")
+    argparser.add_argument("-d", "--density", type = float, default = 0.3, help = "Probability of a cell holding a blizzard.")
+    argparser.add_argument("--directions", type = str, default = "<>^v", help = "Blizzard directions to pick from, repeat a direction to make it more likely.")
+    argparser.add_argument("--seed", type = int, default = 0, help = "Seed of the valley generator.")
+    argparser.add_argument("-a", "--algorithms", type = str, default = ",".join(ALGORITHMS), help = "Comma separated solvers to run.")
+    argparser.add_argument("-r", "--repeat", type = int, default = 1, help = "Runs per measurement, the fastest one is reported.")
+    argparser.add_argument("-o", "--output", type = str, default = None, help = "Write the report to this file (.json or .csv).")
+    argparser.add_argument("--scaling", type = str, default = None, metavar = "WORKERS", help = "Comma separated worker counts: only time part 1 of the parallel solver with each of them, against the bitset solver.")
+    argparser.add_argument("--compare", type = str, default = None, metavar = "BASELINE", help = "JSON report of an earlier run to compare the times with.")
+
+    args = argparser.parse_args()
+
+    algorithms: list[str] = args.algorithms.split(",")
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            print(f"Error: Unknown algorithm '{algorithm}'.")
+            quit()
+
+    sizes: list[tuple[int, int]] = [parse_size(size) for size in args.sizes.split(",")]
+    if args.scaling is not None:
+        report: dict = run_scaling(sizes, [int(workers) for workers in args.scaling.split(",")],
+                                   args.density, args.directions, args.seed, max(args.repeat, 1))
+    else:
+        report = run(sizes, args.density, args.directions, args.seed, algorithms, max(args.repeat, 1))
+
+    for row in report["rows"]:
+        name: str = row_name(row)
+        if "speedup" in row:
+            print(f"{name:40} {row['seconds']:10.4f}s   steps {row['part1']}   speedup x{row['speedup']:.2f}")
+        elif "part1" in row:
+            print(f"{name:40} {row['seconds']:10.4f}s   steps {row['part1']} / {row['part2']}")
+        else:
+            print(f"{name:40} {row['seconds']:10.4f}s")
+
+    if report["disagreements"]:
+        print("Error: The solvers disagree on:")
+        for disagreement in report["disagreements"]:
+            print(f"  {disagreement}")
+
+    if args.output is not None:
+        save_report(report, args.output)
+
+    if args.compare is not None:
+        with open(args.compare, "r") as file:
+            baseline: dict = json.load(file)
+        print(f"Compared with {baseline.get('commit')}:")
+        for name, old, new in compare(report, baseline):
+            print(f"{name:40} {old:10.4f}s -> {new:10.4f}s   x{new / old if old > 0 else float('inf'):.2f}")
+
+    if report["disagreements"]:
+        sys.exit(1)
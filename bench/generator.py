@@ -0,0 +1,31 @@
+import random
+
+
+# generates a random valley in the input format, the same seed always gives the same valley
+# density is the probability of a cell holding a blizzard, its direction is picked from directions,
+# so repeating a character makes that direction more likely (e.g. "<<>^v")
+def generate_valley(width: int,
+                    height: int,
+                    density: float = 0.3,
+                    directions: str = "<>^v",
+                    seed: int = 0,
+                    entry_x: int = 0,
+                    exit_x: int | None = None) -> str:
+    if width < 1 or height < 1:
+        raise ValueError("width and height must be positive")
+    if not 0 <= density <= 1:
+        raise ValueError("density must be between 0 and 1")
+    if not directions or any(c not in "<>^v" for c in directions):
+        raise ValueError("directions can only contain '<', '>', '^' and 'v'")
+    if exit_x is None:
+        exit_x = width - 1
+    if not 0 <= entry_x < width or not 0 <= exit_x < width:
+        raise ValueError("entry_x and exit_x must be within the valley width")
+
+    rng = random.Random(seed)
+    lines: list[str] = ["#" * (entry_x + 1) + "." + "#" * (width - entry_x)]
+    for _ in range(height):
+        row: str = "".join(rng.choice(directions) if rng.random() < density else "." for _ in range(width))
+        lines.append("#" + row + "#")
+    lines.append("#" * (exit_x + 1) + "." + "#" * (width - exit_x))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,212 @@
+from collections.abc import Callable
+import csv
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import TypeVar
+
+from bitset import BitsetBFS
+from generator import generate_valley
+from parallel import ParallelBitsetBFS
+from parser import parse_file, parse_lines
+from solvers import ALGORITHMS, choose_solver
+from state import State
+from world import World
+
+
+SIMULATED_STEPS: int = 50
+
+T = TypeVar("T")
+
+
+# best wall time over at least one run, and the result of the last run
+def measure(function: Callable[[], T], repeat: int) -> tuple[float, T]:
+    start: float = time.perf_counter()
+    result: T = function()
+    best: float = time.perf_counter() - start
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# part 1 and part 2 step counts, or None from the first phase without a solution
+def solve_all_phases(algorithm: str, world: World) -> tuple[int | None, int | None]:
+    state: State | None = State(player_x = world.entry_x, player_y = -1, time = 0)
+    steps: list[int | None] = []
+    for forward in (True, False, True):
+        state = choose_solver(algorithm, world, state).solve(forward=forward)
+        if state is None:
+            break
+        steps.append(state.time)
+    steps += [None] * (3 - len(steps))
+    return steps[0], steps[2]
+
+
+def step_world(world: World) -> None:
+    for _ in range(SIMULATED_STEPS):
+        world.step()
+
+
+def blocked_rows(world: World) -> None:
+    for step in range(SIMULATED_STEPS):
+        for y in range(world.height):
+            world.blocked_row(y, step)
+
+
+# times parsing, simulation and every solver on one generated valley
+def run_size(width: int,
+             height: int,
+             density: float,
+             directions: str,
+             seed: int,
+             algorithms: list[str],
+             repeat: int) -> list[dict]:
+    base: dict = {"width": width, "height": height, "density": density, "directions": directions, "seed": seed}
+    rows: list[dict] = []
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+        file.write(generate_valley(width, height, density, directions, seed))
+    try:
+        seconds, parsed = measure(lambda: parse_file(file.name), repeat)
+    finally:
+        os.remove(file.name)
+    rows.append(base | {"stage": "parse", "seconds": seconds})
+    map_int, entry_x, exit_x = parsed
+
+    seconds, world = measure(lambda: World(map_int, entry_x, exit_x), repeat)
+    rows.append(base | {"stage": "world", "seconds": seconds})
+    seconds, _ = measure(lambda: step_world(World(map_int, entry_x, exit_x)), repeat)
+    rows.append(base | {"stage": f"step x{SIMULATED_STEPS}", "seconds": seconds})
+    seconds, _ = measure(lambda: blocked_rows(world), repeat)
+    rows.append(base | {"stage": f"blocked_row x{SIMULATED_STEPS}", "seconds": seconds})
+
+    for algorithm in algorithms:
+        seconds, steps = measure(lambda: solve_all_phases(algorithm, World(map_int, entry_x, exit_x)), repeat)
+        part1, part2 = steps
+        rows.append(base | {"stage": "solve", "algorithm": algorithm, "seconds": seconds,
+                            "part1": part1, "part2": part2})
+    return rows
+
+
+# times part 1 of the parallel solver on one generated valley with every number of workers,
+# the speedup is relative to the bitset solver it splits into bands
+def run_scaling_size(width: int,
+                     height: int,
+                     density: float,
+                     directions: str,
+                     seed: int,
+                     worker_counts: list[int],
+                     repeat: int) -> list[dict]:
+    base: dict = {"width": width, "height": height, "density": density, "directions": directions, "seed": seed,
+                  "stage": "part1"}
+    map_int, entry_x, exit_x = parse_lines(generate_valley(width, height, density, directions, seed).encode().splitlines())
+    world: World = World(map_int, entry_x, exit_x)
+    state0: State = State(player_x = entry_x, player_y = -1, time = 0)
+
+    baseline, state = measure(lambda: BitsetBFS(world, state0).solve(), repeat)
+    rows: list[dict] = [base | {"algorithm": "bitset", "seconds": baseline, "part1": _steps(state), "part2": None}]
+    for workers in worker_counts:
+        seconds, state = measure(lambda: ParallelBitsetBFS(world, state0, workers).solve(), repeat)
+        rows.append(base | {"algorithm": "parallel", "workers": workers, "seconds": seconds,
+                            "part1": _steps(state), "part2": None, "speedup": baseline / seconds})
+    return rows
+
+
+def _steps(state: State | None) -> int | None:
+    return None if state is None else state.time
+
+
+# solvers disagreeing on the step counts of any valley
+def check_agreement(rows: list[dict]) -> list[str]:
+    errors: list[str] = []
+    answers: dict[tuple, dict[str, tuple]] = {}
+    for row in rows:
+        if "part1" in row:
+            key = (row["width"], row["height"], row["density"], row["directions"], row["seed"])
+            solver: str = row["algorithm"] + (f" x{row['workers']}" if "workers" in row else "")
+            answers.setdefault(key, {})[solver] = (row["part1"], row["part2"])
+    for key, results in answers.items():
+        if len(set(results.values())) > 1:
+            errors.append(f"{key[0]}x{key[1]} (seed {key[4]}): {results}")
+    return errors
+
+
+def commit_hash() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: list[tuple[int, int]],
+        density: float = 0.3,
+        directions: str = "<>^v",
+        seed: int = 0,
+        algorithms: list[str] | None = None,
+        repeat: int = 1) -> dict:
+    if algorithms is None:
+        algorithms = list(ALGORITHMS)
+    rows: list[dict] = []
+    for width, height in sizes:
+        rows += run_size(width, height, density, directions, seed, algorithms, repeat)
+    return {
+        "commit": commit_hash(),
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rows": rows,
+        "disagreements": check_agreement(rows),
+    }
+
+
+def run_scaling(sizes: list[tuple[int, int]],
+                worker_counts: list[int],
+                density: float = 0.3,
+                directions: str = "<>^v",
+                seed: int = 0,
+                repeat: int = 1) -> dict:
+    rows: list[dict] = []
+    for width, height in sizes:
+        rows += run_scaling_size(width, height, density, directions, seed, worker_counts, repeat)
+    return {
+        "commit": commit_hash(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rows": rows,
+        "disagreements": check_agreement(rows),
+    }
+
+
+def save_report(report: dict, file_path: str) -> None:
+    if file_path.endswith(".csv"):
+        fields: list[str] = ["width", "height", "density", "directions", "seed", "stage", "algorithm",
+                             "workers", "seconds", "part1", "part2", "speedup"]
+        with open(file_path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(report["rows"])
+    else:
+        with open(file_path, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+def row_name(row: dict) -> str:
+    name: str = f"{row['width']}x{row['height']} {row['stage']}"
+    if "algorithm" in row:
+        name += f" {row['algorithm']}"
+    if "workers" in row:
+        name += f" x{row['workers']}"
+    return name
+
+
+# old and new time of every measurement found in both reports
+def compare(report: dict, baseline: dict) -> list[tuple[str, float, float]]:
+    old: dict[str, float] = {row_name(row): row["seconds"] for row in baseline["rows"] if "seconds" in row}
+    return [(row_name(row), old[row_name(row)], row["seconds"])
+            for row in report["rows"] if "seconds" in row and row_name(row) in old]
@@ -1,21 +1,22 @@
-from solver import Solver
-from bfs import BFS
-from graphics import Graphics
+from api import NoSolutionError, Solution, check_legs, itinerary_name, load_world, solve
+from solver import no_solution_message
+from solvers import ALGORITHMS
 from state import State
-from parser import parse
+from parser import ParseError
 from world import World
+from arrival import ArrivalTable, earliest_arrivals
+from multi import MultiSourceBFS
+from agents import ConflictBasedSearch
+from batch import run_batch
+from replay import ReplayWriter, open_output
+from background import BackgroundSolve
+from cache import CACHE_DIRECTORY, SolutionCache, cache_key
+from stats import format_reports
 
 import argparse
-from collections import deque
-
-
-def choose_solver(algorithm: str, world: World, state0: State) -> Solver:
-    match algorithm:
-        case "bfs":
-            return BFS(world, state0)
-        case _:
-            print("Error: Invalid algorithm identifier.")
-            quit()
+import json
+import sys
+import tracemalloc
 
 
 def main(file_path: str,
@@ -23,108 +24,271 @@ def main(file_path: str,
         algorithm: str,
         part1_only: bool,
         no_gui: bool,
-        quiet: bool) -> None:
+        quiet: bool,
+        use_numpy: bool = False,
+        legs: int | None = None,
+        arrivals_path: str | None = None,
+        stats_format: str | None = None,
+        gates: bool = False,
+        export_path: str | None = None,
+        workers: int | None = None,
+        replay_path: str | None = None,
+        every: int = 1,
+        diff: bool = False,
+        budget: float | None = None,
+        cache_path: str | None = None,
+        cache_size: int = 512,
+        agents: int | None = None) -> None:
     try:
-        with open(file_path, "r") as file:
-            content = file.read()
+        world: World = load_world(file_path, gates, use_numpy)
     except FileNotFoundError:
         print(f"Error: File '{file_path}' not found.")
         return
+    except ParseError as e:
+        print(f"Error: {e}")
+        quit()
+    except ImportError:
+        print("Error: --numpy requires the numpy package.")
+        quit()
     except Exception as e:
         print(f"Error: {e}")
         return
-
-    map_int: list[list[int]]
-    entry_x: int
-    exit_x: int
-    map_int, entry_x, exit_x = parse(content)
-
-    world: World = World(map_int, entry_x, exit_x)
     state0: State = State(
-        player_x = entry_x,
+        player_x = world.entry_x,
         player_y = -1,
         time = 0,
     )
 
-    graphics: Graphics
-
     if manual:
-        graphics = Graphics(world)
-        graphics.run_manual()
+        from graphics import Graphics
+        Graphics(world).run_manual()
         quit()
 
-    phase_1_solver: Solver = choose_solver(algorithm, world, state0)
-    phase_1_state: State | None = phase_1_solver.solve(forward=True)
-    final_state: State | None = None
+    if arrivals_path is not None:
+        table: ArrivalTable = earliest_arrivals(world)
+        if arrivals_path != "":
+            table.save(arrivals_path)
+        if not quiet:
+            print("Departure Arrival Duration")
+            for departure in range(table.period):
+                arrival: int | None = table.arrival(departure)
+                if arrival is None:
+                    print(f"{departure} - -")
+                else:
+                    print(f"{departure} {arrival} {arrival - departure}")
+        quit()
 
-    if part1_only:
-        final_state = phase_1_state
-    else:
-        # phase 2
-        if phase_1_state is not None:
-            phase_2_solver: Solver = choose_solver(algorithm, world, phase_1_state)
-            phase_2_state: State | None = phase_2_solver.solve(forward=False)
-            if phase_2_state is not None:
-                # phase 3
-                phase_3_solver: Solver = choose_solver(algorithm, world, phase_2_state)
-                final_state = phase_3_solver.solve(forward=True)
+    if agents is not None:
+        # the parties start at the entries in turn, all at minute 0
+        entries: list[int] = sorted(world.entries)
+        planner: ConflictBasedSearch = ConflictBasedSearch(world,
+                                                           [State(player_x = entries[i % len(entries)], player_y = -1, time = 0) for i in range(agents)])
+        finals: list[State] | None = planner.plan()
+        if finals is None:
+            if planner.failed_agent is None:
+                print("No plan found: the parties always get in each other's way.")
+            elif planner.no_solution is None:
+                print(f"No plan found for party {planner.failed_agent + 1}.")
             else:
-                print("No solution found in phase 2.")
-                quit()
+                print(f"No plan found for party {planner.failed_agent + 1}: {planner.no_solution}.")
+        elif quiet:
+            print(f"{max(state.time for state in finals)}")
         else:
-            print("No solution found in phase 1.")
-            quit()
+            print("Party Entry Arrival Exit")
+            for party, final in enumerate(finals, start=1):
+                print(f"{party} {planner.initial_states[party - 1].player_x} {final.time} {final.player_x}")
+            if not planner.optimal:
+                print("(planned one party after the other, the arrivals may not be the earliest possible)")
+        quit()
 
-    if final_state is None:
-        print("No solution found.")
+    if gates:
+        gate_solver: MultiSourceBFS = MultiSourceBFS(world,
+                                                     [State(player_x = x, player_y = -1, time = 0) for x in sorted(world.entries)],
+                                                     [(x, world.height) for x in sorted(world.exits)])
+        earliest: State | None = gate_solver.solve()
+        if earliest is None:
+            print(no_solution_message(None, gate_solver))
+        elif quiet:
+            print(f"{earliest.time}")
+        else:
+            print("Exit Arrival Entry")
+            for x, _ in gate_solver.goals:
+                arrival_state: State | None = gate_solver.arrivals.get((x, world.height))
+                if arrival_state is None:
+                    print(f"{x} - -")
+                    continue
+                source: State = arrival_state
+                while source.previous is not None:
+                    source = source.previous
+                print(f"{x} {arrival_state.time} {source.player_x}")
         quit()
-    
+
+    if algorithm not in ALGORITHMS:
+        print("Error: Invalid algorithm identifier.")
+        quit()
+
+    # solutions of earlier runs, and the blizzards of a whole period memory-mapped for the solvers
+    cache: SolutionCache | None = None
+    key: str = ""
+    if cache_path is not None and stats_format is None:
+        cache = SolutionCache(cache_path or CACHE_DIRECTORY, cache_size << 20)
+        key = cache_key(world, itinerary_name(part1_only, legs))
+
+    if not no_gui and not quiet and export_path is None and legs is None and stats_format is None \
+            and (cache is None or cache.load_solution(key) is None):
+        # open the window right away, and solve the phases in the background while it is shown
+        from graphics import Graphics
+        if cache is not None:
+            world.occupancy_table = cache.occupancy(world)
+        job: BackgroundSolve = BackgroundSolve(world, algorithm, state0, part1_only, budget, workers).start()
+        Graphics(world).run_background(job)
+        if cache is not None and job.finished is not None and job.finished.state is not None:
+            cache.store_solution(key, job.phases, job.finished.state, "")
+        return
+
+    reports: list[dict] | None = None
+    if stats_format is not None:
+        reports = []
+        tracemalloc.start()
+
+    result: Solution | None = None
+    failure: str = ""
+    try:
+        result = solve(world, algorithm, part1_only, legs, workers, cache, reports)
+    except NoSolutionError as e:
+        failure = e.message
+
+    if reports is not None and stats_format is not None:
+        tracemalloc.stop()
+        print(format_reports(reports, stats_format), file=sys.stderr)
+
+    if result is None:
+        print(failure)
+        quit()
+
     if quiet:
-        print(f"{final_state.time}")
+        print(f"{result.steps}")
         quit()
 
-    # walk back solution path
-    current_state: State | None = final_state
-    solution: deque[State] = deque([final_state])
+    solution: list[State] = result.path()
 
-    while current_state is not None:
-        previous_state: State | None = current_state.previous
-        if previous_state is not None:
-            solution.appendleft(previous_state)
-        current_state = previous_state
+    if export_path is not None:
+        # drawsvg is only needed here
+        from export import export_animation, export_frames
+        # the solvers query blizzards by time, so the world is still at step 0
+        if export_path.endswith(".svg"):
+            export_animation(world, solution, export_path, workers = workers)
+            print(f"Saved an animation of {len(solution)} frames to {export_path}")
+        else:
+            export_frames(world, solution, export_path, workers = workers)
+            print(f"Saved {len(solution)} frames to {export_path}")
+        quit()
 
-    fresh_world: World = World(map_int, entry_x, exit_x)  # fresh world for drawing, the original world is no longer at step 0
     # print solution path
+    # the solvers query blizzards by time, so the world is still at step 0
     if no_gui:
-        for state in solution:
-            print(f"Step {state.time}:")
-            print(fresh_world.draw(state.player_x, state.player_y))
-            fresh_world.step()
+        with open_output(replay_path) as stream:
+            ReplayWriter(world, stream, every, diff).write_all(solution)
         print (f"Total steps: {len(solution) - 1}") # initial state is not counted
+        for phase, solver in enumerate(result.solvers, start=1):
+            print(f"Nodes expanded in phase {phase}: {solver.expanded}")
     else:
-        graphics = Graphics(fresh_world)
-        graphics.run(solution)
+        from graphics import Graphics
+        Graphics(world).run(solution)
 
 
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser(description = "Solve AOC 2022 Day 24 (Blizzard Basin) for a given input. See the README file for more info.", usage="%(prog)s FILE_PATH [options]")
     
-    argparser.add_argument("file", metavar="FILE_PATH", type = str, default = "", help = "Path to the input file")
+    argparser.add_argument("files", metavar="FILE_PATH", type = str, nargs = "*", help = "Path to the input file (several files or directories with --batch, none with --serve)")
     
     # flags
     argparser.add_argument("-m", "--manual", action = "store_true", help = "Control the simulation manually.")
-    argparser.add_argument("-a", "--algorithm", type = str, default = "bfs", help = "Algorithm to use (bfs, ...). Not implemented.")
+    argparser.add_argument("-a", "--algorithm", type = str, default = "bfs", help = "Algorithm to use (bfs, bitset, astar, compact, parallel, checkpoint, incremental).")
     argparser.add_argument("--part1", action = "store_true", help = "Only run part 1.")
     argparser.add_argument("--no-gui", action = "store_true", help = "Print solution to the console.")
     argparser.add_argument("-q", "--quiet", action = "store_true", help = "Only print the required number of steps to the console (implies --no-gui).")
+    argparser.add_argument("--numpy", action = "store_true", help = "Store the blizzards in NumPy arrays (requires numpy).")
+    argparser.add_argument("--arrivals", nargs = "?", const = "", default = None, metavar = "OUT_FILE", help = "Print the earliest arrival for every departure time in a blizzard period, and save the table as JSON if OUT_FILE is given.")
+    argparser.add_argument("--batch", action = "store_true", help = "Solve every input file (or every file in the given directories) in a process pool, printing one JSON line per input.")
+    argparser.add_argument("--workers", type = int, default = None, metavar = "N", help = "Number of worker processes for --batch, --export and the parallel algorithm (default: number of CPUs).")
+    argparser.add_argument("--stats", nargs = "?", const = "text", default = None, choices = ["text", "json"], help = "Print solver statistics for every phase to stderr, as text or json.")
+    argparser.add_argument("--gates", action = "store_true", help = "Allow several gates in the top and bottom walls, and print the earliest arrival at every exit gate from any entry gate.")
+    argparser.add_argument("--export", type = str, default = None, metavar = "PATH", help = "Save the solution as an animated SVG if PATH ends with .svg, otherwise as one SVG file per step in the directory PATH, without opening a window.")
+    argparser.add_argument("--replay-out", type = str, default = None, metavar = "OUT_FILE", help = "Write the frames of --no-gui to OUT_FILE instead of the console.")
+    argparser.add_argument("--every", type = int, default = 1, metavar = "N", help = "Only print every Nth frame with --no-gui (and the last one).")
+    argparser.add_argument("--diff", action = "store_true", help = "With --no-gui, only print the lines that changed since the previous frame.")
+    argparser.add_argument("--budget", type = float, default = None, metavar = "SECONDS", help = "Give up solving in the GUI after SECONDS.")
+    argparser.add_argument("--cache", nargs = "?", const = "", default = None, metavar = "DIR", help = f"Reuse the solutions of earlier runs on the same valley, and keep the blizzards of a whole period on disk (default DIR: {CACHE_DIRECTORY}). Ignored with --stats.")
+    argparser.add_argument("--cache-size", type = int, default = 512, metavar = "MB", help = "Size of the cache, the least recently used valleys are removed beyond it.")
+    argparser.add_argument("--serve", nargs = "?", const = "", default = None, metavar = "SOCKET", help = "Answer JSON solve requests, one per line, from stdin or from the Unix socket SOCKET, keeping the valleys in memory. See the README for the format.")
+    argparser.add_argument("--agents", type = int, default = None, metavar = "N", help = "Plan N parties crossing the valley at once, never in the same cell at the same minute, and print the arrival of every party.")
+    argparser.add_argument("--legs", type = int, default = None, metavar = "N", help = "Travel N legs between entry and exit in a single search (overrides --algorithm and --part1).")
 
     args = argparser.parse_args()
 
-    file_path = args.file
+    if args.serve is not None:
+        from server import SolveServer
+        server_cache: SolutionCache | None = None
+        if args.cache is not None:
+            server_cache = SolutionCache(args.cache or CACHE_DIRECTORY, args.cache_size << 20)
+        server: SolveServer = SolveServer(server_cache, args.workers)
+        try:
+            if args.serve == "":
+                server.serve_stream(sys.stdin, sys.stdout)
+            else:
+                server.serve_socket(args.serve)
+        except KeyboardInterrupt:
+            pass
+        except ValueError as e:
+            print(f"Error: {e}.")
+        quit()
+    if not args.files:
+        print("Error: FILE_PATH is required.")
+        quit()
+    if args.batch:
+        for result in run_batch(args.files, args.algorithm, args.part1, args.workers):
+            print(json.dumps(result), flush = True)
+        quit()
+    if len(args.files) > 1:
+        print("Error: Only one FILE_PATH is allowed without --batch.")
+        quit()
+
+    file_path = args.files[0]
     manual = args.manual
     algorithm = args.algorithm
     part1_only = args.part1
     no_gui = args.no_gui
     quiet = args.quiet
+    use_numpy = args.numpy
+    legs = args.legs
+    arrivals_path = args.arrivals
+    stats_format = args.stats
+    gates = args.gates
+    export_path = args.export
+    workers = args.workers
+    replay_path = args.replay_out
+    every = args.every
+    diff = args.diff
+    budget = args.budget
+    cache_path = args.cache
+    cache_size = args.cache_size
+    agents = args.agents
+    try:
+        check_legs(legs)
+    except ValueError:
+        print("Error: --legs must be at least 1.")
+        quit()
+    if every < 1:
+        print("Error: --every must be at least 1.")
+        quit()
+    if agents is not None and agents < 1:
+        print("Error: --agents must be at least 1.")
+        quit()
+    # the table is computed from the entry to the exit, not between sets of gates
+    if arrivals_path is not None and gates:
+        print("Error: --arrivals cannot be used with --gates.")
+        quit()
 
-    main(file_path, manual, algorithm, part1_only, no_gui, quiet)
\ No newline at end of file
+    main(file_path, manual, algorithm, part1_only, no_gui, quiet, use_numpy, legs, arrivals_path, stats_format, gates,
+         export_path, workers, replay_path, every, diff, budget, cache_path, cache_size, agents)
\ No newline at end of file
@@ -0,0 +1,235 @@
+from collections.abc import Iterable
+import heapq
+
+from solver import NoSolution, Solver
+from state import State
+from world import NeighbourTable, World
+
+
+# cells and minutes an agent must not be in, as (x, y, time)
+Constraints = frozenset[tuple[int, int, int]]
+
+# single-agent searches per agent before settling for the prioritized plan, for agents that keep getting in each
+# other's way (several agents following the same corridor can make the search exponential)
+SEARCHES_PER_AGENT: int = 8
+
+
+# BFS for a single agent that must stay out of the given cells at the given minutes.
+# among the earliest paths, the one through the fewest of the cells to avoid (the cells of the other agents) is picked
+class AgentSearch(Solver):
+    def __init__(self,
+                world: World,
+                initial_state: State,
+                constraints: Constraints = frozenset(),
+                avoid: Constraints = frozenset()) -> None:
+        self.world = world
+        self.initial_state = initial_state
+        self.constraints = constraints
+        self.avoid = avoid
+        # after the last constrained minute, the search only depends on the cells reached and the blizzards
+        self.free_from: int = max((time for _, _, time in constraints), default=-1)
+        self.expanded = 0
+        self.no_solution = None
+        self._snapshots = {}
+
+    # returns the earliest state at a goal (the exits if forward, otherwise the entries), otherwise None
+    def solve(self, forward: bool = True) -> State | None:
+        world: World = self.world
+        table: NeighbourTable = world.neighbour_table()
+        time: int = self.initial_state.time
+        if world.is_blocked_at(self.initial_state.player_x, self.initial_state.player_y, time) \
+                or (self.initial_state.player_x, self.initial_state.player_y, time) in self.constraints:
+            self.no_solution = NoSolution(time, 0)
+            return None
+        start: int = world.cell_id(self.initial_state.player_x, self.initial_state.player_y)
+        layer: dict[int, State] = {start: self.initial_state}
+        # cells to avoid on the way to every state of the layer
+        crossed: dict[int, int] = {start: 0}
+        while layer:
+            arrivals: list[State] = [state for state in layer.values()
+                                     if world.is_solved(state.player_x, state.player_y, forward)]
+            if arrivals:
+                return min(arrivals, key=lambda state: crossed[world.cell_id(state.player_x, state.player_y)])
+            if self.stats is not None:
+                self.stats.layer(time, len(layer), len(layer))
+            time += 1
+            blocked: list[int] = self._blocked_rows(time)
+            next_layer: dict[int, State] = {}
+            next_crossed: dict[int, int] = {}
+            for cell, state in layer.items():
+                self.expanded += 1
+                for i in range(table.start[cell], table.start[cell + 1]):
+                    next_cell: int = table.neighbours[i]
+                    x: int = table.xs[next_cell]
+                    y: int = table.ys[next_cell]
+                    count: int = crossed[cell] + ((x, y, time) in self.avoid)
+                    if next_cell in next_layer and next_crossed[next_cell] <= count:
+                        continue
+                    if 0 <= y < world.height and blocked[y] >> x & 1:
+                        continue
+                    if (x, y, time) in self.constraints:
+                        continue
+                    next_layer[next_cell] = State(x, y, time, state)
+                    next_crossed[next_cell] = count
+            layer = next_layer
+            crossed = next_crossed
+            if time > self.free_from and time % world.period == 0 and self._repeats(time, frozenset(layer)):
+                return None
+        self.no_solution = NoSolution(time, 0)
+        return None
+
+
+# positions of a path by minute, from its first state to its last
+def _positions(final_state: State) -> dict[int, tuple[int, int]]:
+    positions: dict[int, tuple[int, int]] = {}
+    state: State | None = final_state
+    while state is not None:
+        positions[state.time] = (state.player_x, state.player_y)
+        state = state.previous
+    return positions
+
+
+# conflict-based search for several agents sharing the valley: no two agents may be in the same cell at the
+# same minute, except in the entry and exit rows, where any number of agents can wait.
+# every agent is first planned alone; only when two paths meet, the search branches on which of the two
+# agents stays out of that cell at that minute, and replans that agent alone with the extra constraint.
+# agents that do not get in each other's way therefore cost a single search each.
+# when paths meet, the agents are also planned one after the other, each one staying out of the cells of the
+# agents before it. that prioritized plan bounds the search, which stops once it cannot find a cheaper plan, and
+# is returned (as a valid plan that may arrive later) when the search runs out of max_searches.
+# the plans minimize the sum of the arrival times
+class ConflictBasedSearch:
+    def __init__(self,
+                world: World,
+                initial_states: Iterable[State],
+                forward: bool = True,
+                max_searches: int | None = None) -> None:
+        self.world = world
+        self.initial_states: list[State] = list(initial_states)
+        if not self.initial_states:
+            raise ValueError("There must be at least one agent")
+        self.forward = forward
+        # single-agent searches of a plan, all of them included
+        self.max_searches: int = max_searches if max_searches is not None \
+            else SEARCHES_PER_AGENT * len(self.initial_states)
+        # single-agent searches run, and the states they expanded
+        self.searches: int = 0
+        self.expanded: int = 0
+        # high-level nodes expanded
+        self.nodes: int = 0
+        # whether the last plan is known to minimize the sum of the arrival times
+        self.optimal: bool = False
+        # set when plan returns None: the agent that cannot arrive on its own, or None if the agents only get in
+        # each other's way
+        self.no_solution: NoSolution | None = None
+        self.failed_agent: int | None = None
+
+    # plans one agent alone, away from the cells of the other agents where it can
+    def _search(self, agent: int, constraints: Constraints, finals: list[State]) -> State | None:
+        avoid: set[tuple[int, int, int]] = set()
+        for other, final in enumerate(finals):
+            if other != agent:
+                avoid.update((x, y, time) for time, (x, y) in _positions(final).items() if 0 <= y < self.world.height)
+        search: AgentSearch = AgentSearch(self.world, self.initial_states[agent], constraints, frozenset(avoid))
+        state: State | None = search.solve(self.forward)
+        self.searches += 1
+        self.expanded += search.expanded
+        if state is None:
+            self.no_solution = search.no_solution
+        return state
+
+    # the earliest minute two agents are in the same cell of the valley, as (time, agent, other agent, x, y),
+    # and the number of such meetings
+    def _conflicts(self, finals: list[State]) -> tuple[tuple[int, int, int, int, int] | None, int]:
+        first: tuple[int, int, int, int, int] | None = None
+        count: int = 0
+        seen: dict[tuple[int, int, int], int] = {}
+        for agent, final in enumerate(finals):
+            for time, (x, y) in _positions(final).items():
+                if y < 0 or y >= self.world.height:
+                    continue
+                other: int = seen.setdefault((x, y, time), agent)
+                if other != agent:
+                    count += 1
+                    if first is None or time < first[0]:
+                        first = (time, other, agent, x, y)
+        return first, count
+
+    # plans the agents in order, every agent staying out of the cells the agents before it go through.
+    # the first agent's plan alone is given, since it has nothing to stay out of
+    def _prioritized(self, first: State) -> list[State] | None:
+        finals: list[State] = [first]
+        taken: set[tuple[int, int, int]] = set()
+        for agent in range(1, len(self.initial_states)):
+            taken.update((x, y, time) for time, (x, y) in _positions(finals[-1]).items() if 0 <= y < self.world.height)
+            state: State | None = self._search(agent, frozenset(taken), [])
+            if state is None:
+                return None
+            finals.append(state)
+        return finals
+
+    # returns the final state of every agent, in the order of initial_states, or None if there is no plan
+    def plan(self) -> list[State] | None:
+        self.searches = 0
+        self.expanded = 0
+        self.nodes = 0
+        self.optimal = False
+        self.no_solution = None
+        self.failed_agent = None
+
+        constraints: list[Constraints] = [frozenset()] * len(self.initial_states)
+        finals: list[State] = []
+        for agent in range(len(self.initial_states)):
+            state: State | None = self._search(agent, constraints[agent], finals)
+            if state is None:
+                self.failed_agent = agent
+                return None
+            finals.append(state)
+        conflict, count = self._conflicts(finals)
+        if conflict is None:
+            self.optimal = True
+            return finals
+
+        # the plan to beat, costing a single search per agent (the first one is already planned alone)
+        best: list[State] | None = self._prioritized(finals[0])
+        bound: int | None = sum(state.time for state in best) if best is not None else None
+
+        # nodes by sum of arrival times, then by number of conflicts, then the latest first:
+        # among plans of the same cost, the search goes deep into the one closest to being free of conflicts
+        # instead of widening over all of them
+        counter: int = 0
+        queue: list[tuple[int, int, int, tuple | None, list[Constraints], list[State]]] = [
+            (sum(state.time for state in finals), count, counter, conflict, constraints, finals)]
+        while queue:
+            cost, _, _, conflict, constraints, finals = heapq.heappop(queue)
+            if bound is not None and cost >= bound:
+                # no plan left in the queue is cheaper than the prioritized one
+                self.optimal = True
+                return best
+            if conflict is None:
+                self.nodes += 1
+                self.optimal = True
+                return finals
+            if self.searches >= self.max_searches:
+                return best
+            self.nodes += 1
+            time, first, second, x, y = conflict
+            for agent in (first, second):
+                agent_constraints: Constraints = constraints[agent] | {(x, y, time)}
+                state = self._search(agent, agent_constraints, finals)
+                if state is None:
+                    continue
+                child_finals: list[State] = list(finals)
+                child_finals[agent] = state
+                child_cost: int = sum(final.time for final in child_finals)
+                if bound is not None and child_cost >= bound:
+                    continue
+                child_constraints: list[Constraints] = list(constraints)
+                child_constraints[agent] = agent_constraints
+                counter -= 1
+                child_conflict, child_count = self._conflicts(child_finals)
+                heapq.heappush(queue, (child_cost, child_count, counter,
+                                       child_conflict, child_constraints, child_finals))
+        # every cheaper plan was ruled out
+        self.optimal = best is not None
+        return best
@@ -0,0 +1,190 @@
+from collections import deque
+from dataclasses import dataclass, field
+import time
+import tracemalloc
+
+from cache import SolutionCache, cache_key
+from incremental import IncrementalBFS
+from itinerary import Itinerary, alternating_waypoints
+from parser import parse_file, parse_file_gates, parse_gate_lines, parse_lines
+from solver import NoSolution, Solver, no_solution_message
+from solvers import ALGORITHMS, choose_solver
+from state import State
+from stats import SolverStats
+from world import World
+
+
+# forward and name of the phases of part 2, part 1 is the first one
+PHASES: list[tuple[bool, str]] = [(True, "1"), (False, "2"), (True, "3")]
+
+
+# raised by solve when a phase has no solution
+class NoSolutionError(Exception):
+    def __init__(self, message: str, phases: list[int], no_solution: NoSolution | None = None) -> None:
+        super().__init__(message)
+        self.message = message
+        # steps at the end of every phase solved before
+        self.phases = phases
+        # None if the failure was loaded from a cache
+        self.no_solution = no_solution
+
+    # the phase without a solution, 1 for the first phase (or the only one)
+    @property
+    def phase(self) -> int:
+        return len(self.phases) + 1
+
+
+@dataclass
+class Solution:
+    # steps at the end of every phase
+    phases: list[int]
+    # the final state, with its chain back to the initial state
+    state: State
+    # solvers of the phases, empty if the solution was loaded from a cache
+    solvers: list[Solver] = field(default_factory=list)
+    cached: bool = False
+
+    @property
+    def steps(self) -> int:
+        return self.state.time
+
+    # all states from the initial one to the final one
+    def path(self) -> list[State]:
+        path: deque[State] = deque()
+        state: State | None = self.state
+        while state is not None:
+            path.appendleft(state)
+            state = state.previous
+        return list(path)
+
+
+def _make_world(map_int: list[list[int]], entries: list[int], exits: list[int], use_numpy: bool) -> World:
+    if use_numpy:
+        # raises ImportError without numpy
+        from numpy_world import NumpyWorld
+        return NumpyWorld(map_int, entries[0], exits[0], entries, exits)
+    return World(map_int, entries[0], exits[0], entries, exits)
+
+
+# reads a valley from a file, raises FileNotFoundError or ParseError
+# gates allows several gates in the top and bottom walls, use_numpy requires numpy
+def load_world(file_path: str, gates: bool = False, use_numpy: bool = False) -> World:
+    if gates:
+        map_int, entries, exits = parse_file_gates(file_path)
+    else:
+        map_int, entry_x, exit_x = parse_file(file_path)
+        entries, exits = [entry_x], [exit_x]
+    return _make_world(map_int, entries, exits, use_numpy)
+
+
+# reads a valley from the text of an input file, raises ParseError
+def parse_world(text: str | bytes, gates: bool = False, use_numpy: bool = False) -> World:
+    lines: list[bytes] = (text.encode() if isinstance(text, str) else text).splitlines()
+    if gates:
+        map_int, entries, exits = parse_gate_lines(lines)
+    else:
+        map_int, entry_x, exit_x = parse_lines(lines)
+        entries, exits = [entry_x], [exit_x]
+    return _make_world(map_int, entries, exits, use_numpy)
+
+
+# solves one phase, adding its stats to reports unless reports is None
+def solve_phase(solver: Solver, forward: bool, phase: str, reports: list[dict] | None) -> State | None:
+    if reports is None:
+        return solver.solve(forward=forward)
+    solver.stats = SolverStats()
+    tracemalloc.reset_peak()
+    start: float = time.perf_counter()
+    state: State | None = solver.solve(forward=forward)
+    wall_time: float = time.perf_counter() - start
+    reports.append(solver.stats.report(phase, solver.expanded, wall_time, tracemalloc.get_traced_memory()[1]))
+    return state
+
+
+# cache key of what solve is asked to solve
+def itinerary_name(part1_only: bool = False, legs: int | None = None) -> str:
+    if legs is not None:
+        return f"legs:{legs}"
+    return "part1" if part1_only else "part2"
+
+
+# raises ValueError unless legs is None or at least 1
+def check_legs(legs: int | None) -> None:
+    if legs is not None and legs < 1:
+        raise ValueError("The number of legs must be at least 1")
+
+
+# solves part 2 (entry, exit, entry, exit), only part 1, or the given number of legs in a single search,
+# starting at the entry at time 0. raises NoSolutionError if a phase has no solution.
+# with a cache, earlier solutions are loaded from it and new ones are stored in it.
+# reports collects the stats of every phase, tracemalloc must then be started by the caller
+def solve(world: World,
+          algorithm: str = "bfs",
+          part1_only: bool = False,
+          legs: int | None = None,
+          workers: int | None = None,
+          cache: SolutionCache | None = None,
+          reports: list[dict] | None = None) -> Solution:
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Invalid algorithm identifier '{algorithm}'")
+    check_legs(legs)
+
+    key: str = ""
+    if cache is not None:
+        key = cache_key(world, itinerary_name(part1_only, legs))
+        cached = cache.load_solution(key)
+        if cached is not None:
+            if cached.state is None:
+                raise NoSolutionError(cached.failure, cached.phases)
+            return Solution(cached.phases, cached.state, cached=True)
+        if world.occupancy_table is None:
+            world.occupancy_table = cache.occupancy(world)
+
+    state: State = State(player_x = world.entry_x, player_y = -1, time = 0)
+    solvers: list[Solver] = []
+    phases: list[int] = []
+    # forward and name of every phase
+    plan: list[tuple[bool, str]] = [(True, "legs")] if legs is not None else PHASES[:1] if part1_only else PHASES
+    for forward, phase in plan:
+        solver: Solver = Itinerary(world, state, alternating_waypoints(world, legs)) if legs is not None \
+            else choose_solver(algorithm, world, state, workers)
+        next_state: State | None = solve_phase(solver, forward, phase, reports)
+        solvers.append(solver)
+        if next_state is None:
+            message: str = no_solution_message(phase if len(plan) > 1 else None, solver)
+            if cache is not None:
+                cache.store_solution(key, phases, None, message)
+            raise NoSolutionError(message, phases, solver.no_solution)
+        state = next_state
+        phases.append(state.time)
+
+    if cache is not None:
+        cache.store_solution(key, phases, state, "")
+    return Solution(phases, state, solvers)
+
+
+# solves the same phases again after blizzards of the world were edited (e.g. with World.add_blizzard), from a
+# solution of the incremental algorithm. every phase keeps its search layers before the first minute an edit can
+# change, unless an earlier phase now ends somewhere else. raises NoSolutionError if a phase has no solution
+def resolve(world: World, previous: Solution) -> Solution:
+    incremental: list[IncrementalBFS] = [solver for solver in previous.solvers if isinstance(solver, IncrementalBFS)]
+    if not incremental or len(incremental) != len(previous.solvers):
+        raise ValueError("Only solutions of the incremental algorithm can be solved again")
+    plan: list[tuple[bool, str]] = PHASES[:len(incremental)]
+    state: State = incremental[0].initial_state
+    solvers: list[Solver] = []
+    phases: list[int] = []
+    for solver, (forward, phase) in zip(incremental, plan):
+        next_state: State | None
+        if solver.initial_state == state:
+            next_state = solver.resolve(state)
+        else:
+            solver = IncrementalBFS(world, state)
+            next_state = solver.solve(forward)
+        solvers.append(solver)
+        if next_state is None:
+            raise NoSolutionError(no_solution_message(phase if len(plan) > 1 else None, solver), phases,
+                                  solver.no_solution)
+        state = next_state
+        phases.append(state.time)
+    return Solution(phases, state, solvers)
@@ -0,0 +1,96 @@
+import json
+
+from world import NeighbourTable, World
+
+
+# earliest arrival for every departure time, which repeats with the blizzards every period steps
+class ArrivalTable:
+    def __init__(self,
+                period: int,
+                arrivals: list[int | None],
+                forward: bool = True) -> None:
+        if len(arrivals) != period:
+            raise ValueError("There must be one arrival per departure time in a period")
+        self.period = period
+        self.arrivals = arrivals
+        self.forward = forward
+
+    # earliest arrival when leaving at the given time, or None if the target cannot be reached
+    def arrival(self, departure: int) -> int | None:
+        arrival: int | None = self.arrivals[departure % self.period]
+        if arrival is None:
+            return None
+        return arrival + departure - departure % self.period
+
+    def duration(self, departure: int) -> int | None:
+        arrival: int | None = self.arrival(departure)
+        if arrival is None:
+            return None
+        return arrival - departure
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            json.dump({"period": self.period, "forward": self.forward, "arrivals": self.arrivals}, file)
+
+    @classmethod
+    def load(cls, file_path: str) -> "ArrivalTable":
+        with open(file_path, "r") as file:
+            data = json.load(file)
+        return cls(data["period"], data["arrivals"], data["forward"])
+
+
+# computes the earliest arrival at the exit (or the entry, if not forward) for every departure in one period
+# a single sweep forward in time labels each cell with the latest departure that can be there at that time.
+# when the target is labelled with departure d at time t, every departure up to d arrives by t
+def earliest_arrivals(world: World, forward: bool = True) -> ArrivalTable:
+    width: int = world.width
+    # cell ids cover the gates in the entry row (y = -1) to the gates in the exit row (y = height)
+    cells: list[tuple[int, int]] = [(x, -1) for x in sorted(world.entries)]
+    cells += [(x, y) for y in range(world.height) for x in range(width)]
+    cells += [(x, world.height) for x in sorted(world.exits)]
+    ids: dict[tuple[int, int], int] = {cell: i for i, cell in enumerate(cells)}
+    # moves are symmetric, so the cells a cell can be reached from are the cells it can move to
+    table: NeighbourTable = world.neighbour_table()
+    neighbours: list[list[int]] = []
+    for x, y in cells:
+        cell: int = world.cell_id(x, y)
+        neighbours.append([ids[(table.xs[n], table.ys[n])]
+                           for n in table.neighbours[table.start[cell]:table.start[cell + 1]]])
+
+    source: int = ids[(world.entry_x, -1)] if forward else ids[(world.exit_x, world.height)]
+    target: int = ids[(world.exit_x, world.height)] if forward else ids[(world.entry_x, -1)]
+    period: int = world.period
+    arrivals: list[int | None] = [None] * period
+
+    # -1 marks cells that cannot be reached by any departure so far
+    labels: list[int] = [-1] * len(cells)
+    labels[source] = 0
+    next_departure: int = 0
+    time: int = 0
+    snapshot: list[int] | None = None
+
+    while next_departure < period:
+        time += 1
+        blocked: list[int] = [world.blocked_row(y, time) for y in range(world.height)]
+        next_labels: list[int] = [-1] * len(cells)
+        for cell, (x, y) in enumerate(cells):
+            if 0 <= y < world.height and blocked[y] >> x & 1:
+                continue
+            next_labels[cell] = max(labels[neighbour] for neighbour in neighbours[cell])
+        # leaving now is always possible, since the source is never blocked
+        next_labels[source] = time
+        labels = next_labels
+
+        while next_departure < period and next_departure <= labels[target]:
+            arrivals[next_departure] = time
+            next_departure += 1
+
+        # until the target is reached, the labels relative to the current time only depend on the time
+        # modulo period: if they are the same as one period ago, the target will never be reached
+        if labels[target] < 0 and time % period == 0:
+            relative: list[int] = [time - label if label >= 0 else -1 for label in labels]
+            if relative == snapshot:
+                break
+            snapshot = relative
+
+    return ArrivalTable(period, arrivals, forward)
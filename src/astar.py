@@ -0,0 +1,79 @@
+
+import heapq
+from state import State
+from solver import NoSolution, Solver
+from world import NeighbourTable, World
+
+
+class AStar(Solver):
+    def __init__(self,
+                world: World,
+                initial_state: State) -> None:
+        self.world = world
+        self.initial_state = initial_state
+        self.queue: list[tuple[int, int, int, State]] = []
+        # the blizzards repeat every world.period steps, so (x, y, time % period) identifies a state
+        self.visited: set[tuple[int, int, int]] = set()
+        # blizzard rows by time % period, computed on first use
+        self.blocked: dict[int, list[int]] = {}
+        self.expanded = 0
+        self.no_solution = None
+
+    # the Manhattan distance to the closest target never overestimates, since the player moves one cell per step
+    def _heuristic(self, state: State, target_xs: list[int], target_y: int) -> int:
+        return min(abs(state.player_x - target_x) for target_x in target_xs) + abs(state.player_y - target_y)
+
+    def _is_blocked(self, state: State) -> bool:
+        if state.player_y < 0 or state.player_y >= self.world.height:
+            return False
+        phase: int = state.time % self.world.period
+        rows: list[int] | None = self.blocked.get(phase)
+        if rows is None:
+            rows = self.blocked[phase] = self._blocked_rows(phase)
+        return rows[state.player_y] >> state.player_x & 1 == 1
+
+    # returns the final state if a solution is found, otherwise None
+    def solve(self, forward: bool = True) -> State | None:
+        target_xs: list[int] = sorted(self.world.exits if forward else self.world.entries)
+        target_y: int = self.world.height if forward else -1
+        period: int = self.world.period
+        table: NeighbourTable = self.world.neighbour_table()
+        width: int = self.world.width
+
+        if self._is_blocked(self.initial_state):
+            self.no_solution = NoSolution(self.initial_state.time, 0)
+            return None
+        latest_time: int = self.initial_state.time
+        # ties are broken towards later states, then by insertion order
+        counter: int = 0
+        self.queue = [(self.initial_state.time + self._heuristic(self.initial_state, target_xs, target_y),
+                       -self.initial_state.time, counter, self.initial_state)]
+
+        while self.queue:
+            current_state: State = heapq.heappop(self.queue)[3]
+            key: tuple[int, int, int] = (current_state.player_x, current_state.player_y, current_state.time % period)
+            if key in self.visited:
+                continue
+            if current_state.time > latest_time:
+                if self.stats is not None:
+                    self.stats.layer(latest_time, len(self.queue) + 1, len(self.visited))
+                latest_time = current_state.time
+            self.visited.add(key)
+            if self.world.is_solved(current_state.player_x, current_state.player_y, forward):
+                return current_state
+            self.expanded += 1
+            cell: int = (current_state.player_y + 1) * width + current_state.player_x
+            time: int = current_state.time + 1
+            for i in range(table.start[cell], table.start[cell + 1]):
+                next_cell: int = table.neighbours[i]
+                next_state = State(table.xs[next_cell], table.ys[next_cell], time, current_state)
+                if self._is_blocked(next_state):
+                    continue
+                if (next_state.player_x, next_state.player_y, next_state.time % period) in self.visited:
+                    continue
+                counter += 1
+                heapq.heappush(self.queue, (next_state.time + self._heuristic(next_state, target_xs, target_y),
+                                            -next_state.time, counter, next_state))
+        # every state of the blizzard cycle that can be reached has been expanded
+        self.no_solution = NoSolution(latest_time, 0)
+        return None
@@ -0,0 +1,135 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import partial
+from queue import Empty, Queue
+import threading
+import time
+
+from solver import Solver, no_solution_message
+from solvers import choose_solver
+from state import State
+from stats import SolverStats
+from world import World
+
+
+# seconds between two progress reports, the solvers report every layer
+PROGRESS_INTERVAL = 0.1
+
+
+# raised inside the solver to stop it, from the layer callback
+class Cancelled(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Progress:
+    phase: int
+    # time layer the search has reached
+    time: int
+    frontier: int
+    # steps of the last phase solved so far, None during phase 1
+    best: int | None
+    elapsed: float
+
+
+@dataclass(frozen=True)
+class PhaseSolved:
+    phase: int
+    state: State
+
+
+# the end of the solve: the final state, or why there is none
+@dataclass(frozen=True)
+class Finished:
+    state: State | None
+    failure: str | None
+
+
+Event = Progress | PhaseSolved | Finished
+
+
+# solves the phases in a worker thread, streaming progress events through a queue
+# iterating blocks until the next event and ends after Finished, poll returns the pending events without waiting
+class BackgroundSolve:
+    def __init__(self,
+                world: World,
+                algorithm: str,
+                initial_state: State,
+                part1_only: bool = False,
+                budget: float | None = None,
+                workers: int | None = None) -> None:
+        self.world = world
+        self.algorithm = algorithm
+        self.initial_state = initial_state
+        self.part1_only = part1_only
+        # seconds the whole solve may take
+        self.budget = budget
+        self.workers = workers
+        self.finished: Finished | None = None
+        # steps at the end of every phase solved so far
+        self.phases: list[int] = []
+        self._events: Queue[Event] = Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._start: float = 0.0
+        self._last_report: float = 0.0
+        self._best: int | None = None
+
+    def start(self) -> "BackgroundSolve":
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    # stops the solver at its next time layer
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def poll(self) -> list[Event]:
+        events: list[Event] = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except Empty:
+                return events
+
+    def __iter__(self) -> Iterator[Event]:
+        while True:
+            event: Event = self._events.get()
+            yield event
+            if isinstance(event, Finished):
+                return
+
+    def _run(self) -> None:
+        state: State = self.initial_state
+        phases: list[bool] = [True] if self.part1_only else [True, False, True]
+        finished: Finished
+        try:
+            for phase, forward in enumerate(phases, start=1):
+                solver: Solver = choose_solver(self.algorithm, self.world, state, self.workers)
+                solver.stats = SolverStats(on_layer=partial(self._on_layer, phase))
+                next_state: State | None = solver.solve(forward=forward)
+                if next_state is None:
+                    finished = Finished(None, no_solution_message(None if self.part1_only else str(phase), solver))
+                    break
+                state = next_state
+                self._best = state.time
+                self.phases.append(state.time)
+                self._events.put(PhaseSolved(phase, state))
+            else:
+                finished = Finished(state, None)
+        except Cancelled as e:
+            finished = Finished(None, str(e))
+        except Exception as e:
+            finished = Finished(None, f"Error: {e}")
+        self.finished = finished
+        self._events.put(finished)
+
+    def _on_layer(self, phase: int, layer_time: int, frontier: int, visited: int) -> None:
+        now: float = time.perf_counter()
+        if self._cancel.is_set():
+            raise Cancelled("Cancelled.")
+        if self.budget is not None and now - self._start > self.budget:
+            raise Cancelled(f"Time budget of {self.budget:g}s exceeded in phase {phase}.")
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self._events.put(Progress(phase, layer_time, frontier, self._best, now - self._start))
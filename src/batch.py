@@ -0,0 +1,64 @@
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from collections.abc import Iterator
+import os
+import time
+
+from api import NoSolutionError, Solution, load_world, solve
+from parser import ParseError
+
+
+# all input files, with directories expanded to the files they contain
+def collect_files(paths: list[str]) -> list[str]:
+    files: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if os.path.isfile(os.path.join(path, name)))
+        else:
+            files.append(path)
+    return files
+
+
+# solves a single input without printing or quitting, the outcome is reported in the returned dict
+def solve_file(file_path: str, algorithm: str = "bfs", part1_only: bool = False) -> dict:
+    result: dict = {
+        "file": file_path,
+        "status": "ok",
+        "part1": None,
+        "part2": None,
+        "wall_time": 0.0,
+    }
+    start: float = time.perf_counter()
+    try:
+        solution: Solution = solve(load_world(file_path), algorithm, part1_only)
+        result["part1"] = solution.phases[0]
+        if not part1_only:
+            result["part2"] = solution.phases[2]
+    except NoSolutionError as e:
+        result["status"] = "no_solution"
+        if e.phases:
+            result["part1"] = e.phases[0]
+        result["phase"] = e.phase
+        result["proof"] = str(e.no_solution)
+    except ParseError as e:
+        result["status"] = "error"
+        result["error"] = e.message
+        result["line"] = e.line
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+# solves all inputs in a process pool, yielding each result as soon as it is done
+def run_batch(paths: list[str],
+              algorithm: str = "bfs",
+              part1_only: bool = False,
+              workers: int | None = None) -> Iterator[dict]:
+    files: list[str] = collect_files(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures: list[Future] = [executor.submit(solve_file, file_path, algorithm, part1_only)
+                                 for file_path in files]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,8 +1,8 @@
 
 from collections import deque
 from state import State
-from solver import Solver
-from world import World
+from solver import NoSolution, Solver
+from world import NeighbourTable, World
 
 
 class BFS(Solver):
@@ -15,23 +15,42 @@ class BFS(Solver):
         self.visited: set[State] = set()
         self.visited.add(initial_state)
         self.current_time: int = initial_state.time
+        self.blocked: list[int] = self._blocked_rows(initial_state.time)
+        self.expanded = 0
+        self.no_solution = None
+        self._snapshots = {}
     
     # returns the final state if a solution is found, otherwise None
     def solve(self, forward: bool = True) -> State | None:
+        table: NeighbourTable = self.world.neighbour_table()
+        width: int = self.world.width
         while self.queue:
             current_state = self.queue.popleft()
             if current_state.time > self.current_time:
-                self.world.step()
+                if self.stats is not None:
+                    self.stats.layer(self.current_time, len(self.queue) + 1, len(self.visited))
                 self.current_time = current_state.time
+                # the queue now holds exactly the states of the new layer
+                if self.current_time % self.world.period == 0 and self._repeats(
+                        self.current_time,
+                        frozenset((state.player_x, state.player_y) for state in (current_state, *self.queue))):
+                    return None
                 self.visited.clear()
-            if self.world.is_dead(current_state.player_x, current_state.player_y):
+                self.blocked = self._blocked_rows(self.current_time)
+            if 0 <= current_state.player_y < self.world.height \
+                    and self.blocked[current_state.player_y] >> current_state.player_x & 1:
                 continue
             if self.world.is_solved(current_state.player_x, current_state.player_y, forward):
                 return current_state
-            for move in self.world.legal_moves(current_state.player_x, current_state.player_y):
-                next_state = current_state.next(move)
+            self.expanded += 1
+            cell: int = (current_state.player_y + 1) * width + current_state.player_x
+            time: int = current_state.time + 1
+            for i in range(table.start[cell], table.start[cell + 1]):
+                next_cell: int = table.neighbours[i]
+                next_state = State(table.xs[next_cell], table.ys[next_cell], time, current_state)
                 if next_state in self.visited:
                     continue
                 self.visited.add(next_state)
                 self.queue.append(next_state)
+        self.no_solution = NoSolution(self.current_time, 0)
         return None
\ No newline at end of file
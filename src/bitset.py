@@ -0,0 +1,103 @@
+
+from collections.abc import Iterable
+from state import State
+from solver import NoSolution, Solver
+from world import World
+
+
+# BFS over whole time layers: the reachable cells of a minute are kept as one bitmask per row
+class BitsetBFS(Solver):
+    def __init__(self,
+                world: World,
+                initial_state: State) -> None:
+        self.world = world
+        self.initial_state = initial_state
+        # frontier rows are shifted by one: row 0 is the entry row, row height + 1 the exit row
+        self.rows: int = world.height + 2
+        full_row: int = (1 << world.width) - 1
+        self.allowed: list[int] = [self._mask(world.entries)] + [full_row] * world.height + [self._mask(world.exits)]
+        self.layers: list[list[int]] = []
+        self.expanded = 0
+        self.no_solution = None
+        self._snapshots = {}
+
+    @staticmethod
+    def _mask(xs: Iterable[int]) -> int:
+        mask: int = 0
+        for x in xs:
+            mask |= 1 << x
+        return mask
+
+    # returns the final state if a solution is found, otherwise None
+    def solve(self, forward: bool = True) -> State | None:
+        time: int = self.initial_state.time
+        frontier: list[int] = [0] * self.rows
+        frontier[self.initial_state.player_y + 1] = 1 << self.initial_state.player_x
+        if self.world.is_blocked_at(self.initial_state.player_x, self.initial_state.player_y, time):
+            self.no_solution = NoSolution(time, 0)
+            return None
+        self.layers = [frontier]
+        return self._search(forward)
+
+    # continues the search from the last layer
+    def _search(self, forward: bool) -> State | None:
+        if forward:
+            goal_row, goal_mask = self.rows - 1, self._mask(self.world.exits)
+        else:
+            goal_row, goal_mask = 0, self._mask(self.world.entries)
+
+        time: int = self.initial_state.time + len(self.layers) - 1
+        frontier: list[int] = self.layers[-1]
+        while any(frontier):
+            reached: int = frontier[goal_row] & goal_mask
+            if reached:
+                # the lowest gate reached
+                return self._walk_back((reached & -reached).bit_length() - 1, goal_row - 1)
+            frontier_size: int = sum(row.bit_count() for row in frontier)
+            self.expanded += frontier_size
+            if self.stats is not None:
+                self.stats.layer(time, frontier_size, frontier_size)
+            time += 1
+            frontier = self._expand(frontier, time)
+            self.layers.append(frontier)
+            if time % self.world.period == 0 and self._repeats(time, tuple(frontier)):
+                return None
+        self.no_solution = NoSolution(time, 0)
+        return None
+
+    # all cells reachable at the given time from the previous frontier
+    def _expand(self, frontier: list[int], time: int) -> list[int]:
+        next_frontier: list[int] = []
+        blocked: list[int] = self._blocked_rows(time)
+        last: int = self.rows - 1
+        for r in range(self.rows):
+            row: int = frontier[r]
+            reach: int = row | (row << 1) | (row >> 1)
+            if r > 0:
+                reach |= frontier[r - 1]
+            if r < last:
+                reach |= frontier[r + 1]
+            reach &= self.allowed[r]
+            if 0 < r < last:
+                reach &= ~blocked[r - 1]
+            next_frontier.append(reach)
+        return next_frontier
+
+    # rebuild the state chain by picking any predecessor in the previous layer, back to the initial state
+    def _walk_back(self, player_x: int, player_y: int) -> State:
+        positions: list[tuple[int, int]] = [(player_x, player_y)]
+        for layer in reversed(self.layers[1:-1]):
+            for dx, dy in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+                x: int = player_x + dx
+                r: int = player_y + dy + 1
+                if x >= 0 and 0 <= r < self.rows and layer[r] >> x & 1:
+                    player_x, player_y = x, r - 1
+                    break
+            positions.append((player_x, player_y))
+
+        state: State = self.initial_state
+        if len(self.layers) == 1:
+            return state
+        for x, y in reversed(positions):
+            state = State(player_x=x, player_y=y, time=state.time + 1, previous=state)
+        return state
@@ -0,0 +1,187 @@
+from array import array
+from collections.abc import Callable
+from dataclasses import dataclass
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+from typing import IO
+
+from state import State
+from world import World
+
+
+# default location of the cache, shared by every run of the same user
+CACHE_DIRECTORY: str = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "blizzard-basin")
+CACHE_SIZE: int = 512 << 20  # bytes
+CACHE_VERSION: int = 1
+
+SOLUTION_FILE = "solution.json"
+PATH_FILE = "path.bin"
+OCCUPANCY_FILE = "occupancy.bin"
+
+
+# content hash of a world: its size, gates and the blizzards of its initial map (edits included),
+# and of the itinerary solved on it, e.g. "part1", "part2" or "legs:5"
+def cache_key(world: World, itinerary: str = "") -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps([CACHE_VERSION, world.width, world.height, world.entry_x, world.exit_x,
+                              sorted(world.entries), sorted(world.exits)]).encode())
+    for y in range(world.height):
+        digest.update(world.row_flags(y, 0))
+    # only the solutions depend on the itinerary, the occupancy key leaves it empty
+    digest.update(itinerary.encode())
+    return digest.hexdigest()
+
+
+# the blocked rows of a whole blizzard period, as memory-mapped bitmasks: row y of time t is at
+# (t * height + y) * row_bytes, little-endian. can be set as World.occupancy_table, and pickles as its file path
+class OccupancyTable:
+    def __init__(self, file_path: str, width: int, height: int, period: int) -> None:
+        self.file_path = file_path
+        self.width = width
+        self.height = height
+        self.period = period
+        self.row_bytes: int = (width + 7) // 8
+        with open(file_path, "rb") as file:
+            self._data: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._data) != period * height * self.row_bytes:
+            self._data.close()
+            raise ValueError(f"'{file_path}' does not hold a whole blizzard period")
+
+    def blocked_row(self, player_y: int, time: int) -> int:
+        offset: int = ((time % self.period) * self.height + player_y) * self.row_bytes
+        return int.from_bytes(self._data[offset:offset + self.row_bytes], "little")
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __reduce__(self) -> tuple:
+        return OccupancyTable, (self.file_path, self.width, self.height, self.period)
+
+    # writes the table of a world, computed from its index
+    @staticmethod
+    def write(world: World, file: IO[bytes]) -> None:
+        row_bytes: int = (world.width + 7) // 8
+        for time in range(world.period):
+            file.write(b"".join(world.blocked_row(y, time).to_bytes(row_bytes, "little")
+                                for y in range(world.height)))
+
+
+# a solution loaded from the cache: the steps at the end of every phase, and the final state with its chain
+# back to time 0, or why there is no solution
+@dataclass(frozen=True)
+class CachedSolution:
+    phases: list[int]
+    state: State | None
+    failure: str
+
+
+# results of earlier runs on disk, one directory per key, evicting the least recently used entries
+# once the whole cache is larger than max_bytes. files are written to a temporary name and renamed,
+# so several processes can share the cache
+class SolutionCache:
+    def __init__(self, directory: str = CACHE_DIRECTORY, max_bytes: int = CACHE_SIZE) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    # marks the entry as used now, for the eviction order
+    def _touch(self, key: str) -> None:
+        try:
+            os.utime(self._entry(key))
+        except OSError:
+            pass
+
+    def _write_file(self, key: str, name: str, write: Callable[[IO[bytes]], object]) -> None:
+        entry: str = self._entry(key)
+        os.makedirs(entry, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=entry, delete=False) as file:
+            write(file)
+        os.replace(file.name, os.path.join(entry, name))
+
+    # the solution stored for the key, or None if there is none
+    def load_solution(self, key: str) -> CachedSolution | None:
+        entry: str = self._entry(key)
+        try:
+            with open(os.path.join(entry, SOLUTION_FILE), "r") as file:
+                solution: dict = json.load(file)
+            positions: array = array("i")
+            if solution["solved"]:
+                with open(os.path.join(entry, PATH_FILE), "rb") as file:
+                    positions.frombytes(file.read())
+        except (OSError, ValueError, KeyError):
+            return None
+        self._touch(key)
+
+        state: State | None = None
+        for i in range(0, len(positions), 2):
+            state = State(player_x=positions[i], player_y=positions[i + 1], time=i // 2, previous=state)
+        return CachedSolution(solution["phases"], state, solution["failure"])
+
+    # stores the steps of the phases solved and the path to the final state,
+    # or the failure message if there is no final state
+    def store_solution(self, key: str, phases: list[int], final_state: State | None, failure: str) -> None:
+        if final_state is not None:
+            positions: list[tuple[int, int]] = []
+            state: State | None = final_state
+            while state is not None:
+                positions.append((state.player_x, state.player_y))
+                state = state.previous
+            path: array = array("i", (value for position in reversed(positions) for value in position))
+            self._write_file(key, PATH_FILE, path.tofile)
+        content: bytes = json.dumps({"solved": final_state is not None, "phases": phases,
+                                      "failure": failure}).encode()
+        self._write_file(key, SOLUTION_FILE, lambda file: file.write(content))
+        self.evict(keep=key)
+
+    # the memory-mapped blizzard period of the world, written first if it is not cached yet
+    # returns None if a single period would not fit in the cache
+    def occupancy(self, world: World) -> OccupancyTable | None:
+        if world.period * world.height * ((world.width + 7) // 8) > self.max_bytes:
+            return None
+        key: str = cache_key(world)
+        file_path: str = os.path.join(self._entry(key), OCCUPANCY_FILE)
+        if not os.path.exists(file_path):
+            self._write_file(key, OCCUPANCY_FILE, lambda file: OccupancyTable.write(world, file))
+            self.evict(keep=key)
+        self._touch(key)
+        return OccupancyTable(file_path, world.width, world.height, world.period)
+
+    # total size of the files of every entry
+    def size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        entries: list[tuple[float, str, int]] = []
+        for name in os.listdir(self.directory):
+            entry: str = os.path.join(self.directory, name)
+            try:
+                size: int = sum(os.path.getsize(os.path.join(entry, file_name)) for file_name in os.listdir(entry))
+                entries.append((os.path.getmtime(entry), name, size))
+            except OSError:
+                # removed by another process in the meantime
+                continue
+        return entries
+
+    # removes the least recently used entries until the cache fits in max_bytes, except the given one.
+    # files that are still mapped by another process stay readable there until they are unmapped
+    def evict(self, keep: str | None = None) -> None:
+        entries: list[tuple[float, str, int]] = sorted(self._entries())
+        total: int = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            total -= size
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
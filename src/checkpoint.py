@@ -0,0 +1,177 @@
+from array import array
+import hashlib
+import tempfile
+from typing import BinaryIO
+
+from bitset import BitsetBFS
+from solver import NoSolution
+from state import State
+from world import World
+
+
+CHECKPOINT_INTERVAL: int = 64
+MAX_CHECKPOINTS: int = 64
+
+
+# bitset BFS that only keeps the current frontier, plus a checkpoint of every interval-th layer.
+# the checkpoints are kept in memory, at most max_checkpoints of them: when there are more, every other one
+# is dropped and the interval doubles. with a directory, they are appended to a temporary file there instead.
+# once the goal is reached, the path is rebuilt backwards one segment between checkpoints at a time,
+# recomputing the layers of the segment from its checkpoint (and checkpointing long segments the same way),
+# so memory stays within about max_checkpoints layers per level of log(steps / interval) levels.
+# the path is the same as the one of BitsetBFS
+class CheckpointBFS(BitsetBFS):
+    def __init__(self,
+                world: World,
+                initial_state: State,
+                interval: int = CHECKPOINT_INTERVAL,
+                max_checkpoints: int = MAX_CHECKPOINTS,
+                directory: str | None = None) -> None:
+        super().__init__(world, initial_state)
+        if interval < 1 or max_checkpoints < 2:
+            raise ValueError("interval must be at least 1 and max_checkpoints at least 2")
+        self.interval = interval
+        self.max_checkpoints = max_checkpoints
+        self.directory = directory
+        self.row_bytes: int = (world.width + 7) // 8
+        # layer offset -> packed frontier, or position of the packed frontier in the file
+        self._checkpoints: dict[int, bytes] = {}
+        self._positions: dict[int, int] = {}
+        self._file: BinaryIO | None = None
+        # the interval of the current search, which grows as checkpoints are thinned
+        self._interval: int = interval
+
+    def _pack(self, frontier: list[int]) -> bytes:
+        return b"".join(row.to_bytes(self.row_bytes, "little") for row in frontier)
+
+    def _unpack(self, packed: bytes) -> list[int]:
+        return [int.from_bytes(packed[r * self.row_bytes:(r + 1) * self.row_bytes], "little")
+                for r in range(self.rows)]
+
+    # keeps the packed frontier of the layer at the given offset
+    def _store(self, offset: int, packed: bytes) -> None:
+        if self._file is not None:
+            self._positions[offset] = self._file.seek(0, 2)
+            self._file.write(packed)
+            return
+        self._checkpoints[offset] = packed
+        if len(self._checkpoints) > self.max_checkpoints:
+            self._interval *= 2
+            self._checkpoints = {o: packed for o, packed in self._checkpoints.items() if o % self._interval == 0}
+
+    def _load(self, offset: int) -> list[int]:
+        if self._file is None:
+            return self._unpack(self._checkpoints[offset])
+        self._file.seek(self._positions[offset])
+        return self._unpack(self._file.read(self.rows * self.row_bytes))
+
+    # returns the final state if a solution is found, otherwise None
+    def solve(self, forward: bool = True) -> State | None:
+        if forward:
+            goal_row, goal_mask = self.rows - 1, self._mask(self.world.exits)
+        else:
+            goal_row, goal_mask = 0, self._mask(self.world.entries)
+        time: int = self.initial_state.time
+        if self.world.is_blocked_at(self.initial_state.player_x, self.initial_state.player_y, time):
+            self.no_solution = NoSolution(time, 0)
+            return None
+
+        self._interval = self.interval
+        self._checkpoints = {}
+        self._positions = {}
+        self._file = tempfile.TemporaryFile(dir=self.directory) if self.directory is not None else None
+        try:
+            frontier: list[int] = [0] * self.rows
+            frontier[self.initial_state.player_y + 1] = 1 << self.initial_state.player_x
+            self._store(0, self._pack(frontier))
+            return self._run(frontier, goal_row, goal_mask)
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._checkpoints = {}
+            self._positions = {}
+
+    # searches forward from the initial frontier, only keeping the current layer and the checkpoints
+    def _run(self, frontier: list[int], goal_row: int, goal_mask: int) -> State | None:
+        start: int = self.initial_state.time
+        time: int = start
+        while any(frontier):
+            reached: int = frontier[goal_row] & goal_mask
+            if reached:
+                # the lowest gate reached
+                return self._recover(time - start, (reached & -reached).bit_length() - 1, goal_row - 1)
+            frontier_size: int = sum(row.bit_count() for row in frontier)
+            self.expanded += frontier_size
+            if self.stats is not None:
+                self.stats.layer(time, frontier_size, frontier_size)
+            time += 1
+            frontier = self._expand(frontier, time)
+            if (time - start) % self._interval == 0:
+                self._store(time - start, self._pack(frontier))
+            if time % self.world.period == 0 and self._repeats(time, self._digest(self._pack(frontier))):
+                return None
+        self.no_solution = NoSolution(time, 0)
+        return None
+
+    # only a digest of the frontier is kept for the cycle check, so that long searches do not pile up snapshots
+    @staticmethod
+    def _digest(packed: bytes) -> bytes:
+        return hashlib.blake2b(packed, digest_size=16).digest()
+
+    # the state chain to the position at the given layer offset, from the checkpoints of the search
+    def _recover(self, end: int, player_x: int, player_y: int) -> State:
+        # positions from the end back to the initial state, as x, y pairs
+        positions: array = array("i", [player_x, player_y])
+        offsets: list[int] = sorted(self._positions if self._file is not None else self._checkpoints)
+        for offset in reversed([offset for offset in offsets if offset < end]):
+            player_x, player_y = self._walk_segment(offset, self._load(offset), end, player_x, player_y, positions)
+            end = offset
+
+        state: State = self.initial_state
+        for i in range(len(positions) // 2 - 2, -1, -1):
+            state = State(player_x=positions[2 * i], player_y=positions[2 * i + 1], time=state.time + 1,
+                          previous=state)
+        return state
+
+    # walks back from the position at layer offset end to the frontier of layer offset start, appending the
+    # position at every layer before end to positions. returns the position at start.
+    # long segments are checkpointed into at most max_checkpoints smaller ones, and walked back one by one
+    def _walk_segment(self,
+                      start: int,
+                      frontier: list[int],
+                      end: int,
+                      player_x: int,
+                      player_y: int,
+                      positions: array) -> tuple[int, int]:
+        time: int = self.initial_state.time + start
+        if end - start <= self.interval:
+            layers: list[list[int]] = [frontier]
+            for _ in range(end - start - 1):
+                time += 1
+                layers.append(self._expand(layers[-1], time))
+            for layer in reversed(layers):
+                player_x, player_y = self._predecessor(layer, player_x, player_y)
+                positions.extend((player_x, player_y))
+            return player_x, player_y
+
+        step: int = max(self.interval, -(-(end - start) // self.max_checkpoints))
+        checkpoints: list[tuple[int, list[int]]] = [(start, frontier)]
+        for offset in range(start + 1, end):
+            time += 1
+            frontier = self._expand(frontier, time)
+            if (offset - start) % step == 0:
+                checkpoints.append((offset, frontier))
+        for offset, checkpoint in reversed(checkpoints):
+            player_x, player_y = self._walk_segment(offset, checkpoint, end, player_x, player_y, positions)
+            end = offset
+        return player_x, player_y
+
+    # any position of the layer the given position can be reached from, in the order BitsetBFS picks them
+    def _predecessor(self, layer: list[int], player_x: int, player_y: int) -> tuple[int, int]:
+        for dx, dy in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+            x: int = player_x + dx
+            r: int = player_y + dy + 1
+            if x >= 0 and 0 <= r < self.rows and layer[r] >> x & 1:
+                return x, r - 1
+        raise RuntimeError("The position cannot be reached from the previous layer")
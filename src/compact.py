@@ -0,0 +1,93 @@
+
+from array import array
+from state import State
+from solver import NoSolution, Solver
+from world import NeighbourTable, World
+
+
+# BFS storing each time layer as flat arrays instead of State objects:
+# the packed cell of every state, and the index of its parent in the previous layer
+class CompactBFS(Solver):
+    def __init__(self,
+                world: World,
+                initial_state: State) -> None:
+        self.world = world
+        self.initial_state = initial_state
+        self.layers: list[array] = []
+        self.parents: list[array] = []
+        self.expanded = 0
+        self.no_solution = None
+        self._snapshots = {}
+
+    # cells are packed as (y + 1) * width + x like World.cell_id, so the entry and exit rows fit in as well
+    def _pack(self, player_x: int, player_y: int) -> int:
+        return (player_y + 1) * self.world.width + player_x
+
+    def _unpack(self, cell: int) -> tuple[int, int]:
+        return cell % self.world.width, cell // self.world.width - 1
+
+    # returns the final state if a solution is found, otherwise None
+    def solve(self, forward: bool = True) -> State | None:
+        world: World = self.world
+        table: NeighbourTable = world.neighbour_table()
+        if forward:
+            goals: set[int] = {self._pack(x, world.height) for x in world.exits}
+        else:
+            goals = {self._pack(x, -1) for x in world.entries}
+        start: int = self._pack(self.initial_state.player_x, self.initial_state.player_y)
+        time: int = self.initial_state.time
+        if world.is_blocked_at(self.initial_state.player_x, self.initial_state.player_y, time):
+            self.no_solution = NoSolution(time, 0)
+            return None
+        if start in goals:
+            return self.initial_state
+
+        # time at which each cell was last added, instead of a visited set that is cleared every minute
+        added: array = array("i", [-1]) * ((world.height + 2) * world.width)
+        cells: array = array("i", [start])
+        self.layers = [cells]
+        self.parents = [array("i", [-1])]
+
+        while cells:
+            time += 1
+            blocked: list[int] = self._blocked_rows(time)
+            next_cells: array = array("i")
+            next_parents: array = array("i")
+            for index, cell in enumerate(cells):
+                self.expanded += 1
+                for i in range(table.start[cell], table.start[cell + 1]):
+                    next_cell: int = table.neighbours[i]
+                    y: int = table.ys[next_cell]
+                    if 0 <= y < world.height and blocked[y] >> table.xs[next_cell] & 1:
+                        continue
+                    if added[next_cell] == time:
+                        continue
+                    added[next_cell] = time
+                    next_cells.append(next_cell)
+                    next_parents.append(index)
+                    if next_cell in goals:
+                        self.layers.append(next_cells)
+                        self.parents.append(next_parents)
+                        return self._walk_back(len(next_cells) - 1)
+            if self.stats is not None:
+                self.stats.layer(time, len(next_cells), len(next_cells))
+            cells = next_cells
+            self.layers.append(cells)
+            self.parents.append(next_parents)
+            if time % world.period == 0 and self._repeats(time, frozenset(cells)):
+                return None
+        self.no_solution = NoSolution(time, 0)
+        return None
+
+    # rebuild the State chain of the solution only, from the parent indices
+    def _walk_back(self, index: int) -> State:
+        path: list[int] = []
+        for layer in range(len(self.layers) - 1, 0, -1):
+            path.append(self.layers[layer][index])
+            index = self.parents[layer][index]
+
+        state: State = self.initial_state
+        for cell in reversed(path):
+            player_x, player_y = self._unpack(cell)
+            state = State(player_x=player_x, player_y=player_y, time=state.time + 1, previous=state)
+        return state
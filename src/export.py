@@ -0,0 +1,212 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import drawsvg as dsvg
+
+from state import State
+from world import World
+
+
+EXPORT_TILE_SIZE = 20
+FRAME_DURATION = 0.2  # seconds per step in animations
+
+# placeholders that split a document into its static parts and the parts that change between frames
+FRAME_MARK = "<!--frame-->"
+TRAJECTORY_MARK = "<!--trajectory-->"
+
+
+# arrow of a single blizzard direction, centred on (0, 0), as drawn by every <use> of it
+def _arrow(flag: int, tile_size: int) -> dsvg.Group:
+    arrow = dsvg.Group(id=f"blizzard-{flag}")
+    # direction the arrow points to, and the perpendicular direction
+    dx, dy = {1: (-1, 0), 2: (0, 1), 4: (1, 0), 8: (0, -1)}[flag]
+    px, py = dy, dx
+    arrow.append(dsvg.Line(-dx, -dy, dx * (tile_size // 2.2), dy * (tile_size // 2.2),
+                           stroke='black', stroke_width=2))
+    arrow.append(dsvg.Lines(dx * (tile_size // 3) - px * (tile_size // 4), dy * (tile_size // 3) - py * (tile_size // 4),
+                            dx * (tile_size // 2 - 0.5), dy * (tile_size // 2 - 0.5),
+                            dx * (tile_size // 3) + px * (tile_size // 4), dy * (tile_size // 3) + py * (tile_size // 4),
+                            close=True,
+                            stroke='none',
+                            fill='black'))
+    return arrow
+
+
+# the document without the changing parts: walls, gates and arrow definitions below the frame, the grid above it.
+# returns the text before the frame, between the frame and the trajectory, and after the trajectory
+def _template(world: World, tile_size: int) -> tuple[str, str, str]:
+    grid_width: int = world.width + 2
+    grid_height: int = world.height + 2
+    map_width: int = grid_width * tile_size
+    map_height: int = grid_height * tile_size
+    svg = dsvg.Drawing(map_width, map_height)
+    for flag in (1, 2, 4, 8):
+        svg.append_def(_arrow(flag, tile_size))
+    svg.append(dsvg.Rectangle(0, 0, map_width, map_height, fill='white'))
+
+    # Draw walls
+    svg.append(dsvg.Rectangle(0, 0, map_width, tile_size, fill='black'))
+    svg.append(dsvg.Rectangle(0, (grid_height - 1) * tile_size, map_width, tile_size, fill='black'))
+    svg.append(dsvg.Rectangle(0, 0, tile_size, map_height, fill='black'))
+    svg.append(dsvg.Rectangle((grid_width - 1) * tile_size, 0, tile_size, map_height, fill='black'))
+
+    # Draw entries and exits
+    for entry_x in world.entries:
+        svg.append(dsvg.Rectangle((entry_x + 1) * tile_size, 0, tile_size, tile_size, fill="#A3A3A3"))
+    for exit_x in world.exits:
+        svg.append(dsvg.Rectangle((exit_x + 1) * tile_size, (grid_height - 1) * tile_size,
+                                  tile_size, tile_size, fill='#A3A3A3'))
+
+    svg.append(dsvg.Raw(FRAME_MARK))
+
+    # Draw grid
+    for i in range(grid_width + 1):
+        svg.append(dsvg.Line(i * tile_size, 0, i * tile_size, map_height, stroke='gray', stroke_width=1))
+    for i in range(grid_height + 1):
+        svg.append(dsvg.Line(0, i * tile_size, map_width, i * tile_size, stroke='gray', stroke_width=1))
+
+    svg.append(dsvg.Raw(TRAJECTORY_MARK))
+
+    head, rest = svg.as_svg().split(FRAME_MARK)
+    middle, tail = rest.split(TRAJECTORY_MARK)
+    return head, middle, tail
+
+
+# the player and the blizzards at the given time, on grid coordinates (walls included)
+def _frame(world: World, time: int, player: tuple[int, int], tile_size: int) -> str:
+    parts: list[str] = [f'<rect x="{player[0] * tile_size}" y="{player[1] * tile_size}" '
+                        f'width="{tile_size}" height="{tile_size}" fill="blue" />']
+    for x, y, cell in world.blizzard_cells(time):
+        center_x: int = (x + 1) * tile_size + tile_size // 2
+        center_y: int = (y + 1) * tile_size + tile_size // 2
+        for flag in (1, 2, 4, 8):
+            if cell & flag:
+                parts.append(f'<use xlink:href="#blizzard-{flag}" x="{center_x}" y="{center_y}" />')
+    return "\n".join(parts)
+
+
+def _center(point: tuple[int, int], tile_size: int) -> str:
+    return f"{point[0] * tile_size + tile_size // 2},{point[1] * tile_size + tile_size // 2}"
+
+
+def _trajectory(trajectory: list[tuple[int, int]], tile_size: int) -> str:
+    if len(trajectory) < 2:
+        return ""
+    points: str = " ".join(_center(point, tile_size) for point in trajectory)
+    return f'<polyline points="{points}" fill="none" stroke="#FF00FF" stroke-width="2" />'
+
+
+# saves a single frame, with the player at the given grid cell and the trajectory so far
+def save_frame(world: World,
+               time: int,
+               player: tuple[int, int],
+               trajectory: list[tuple[int, int]],
+               file_path: str,
+               tile_size: int = EXPORT_TILE_SIZE) -> None:
+    head, middle, tail = _template(world, tile_size)
+    with open(file_path, "w") as file:
+        file.write(head + _frame(world, time, player, tile_size) + middle + _trajectory(trajectory, tile_size) + tail)
+
+
+# grid cells of the player along a solution
+def _positions(solution: list[State]) -> list[tuple[int, int]]:
+    return [(state.player_x + 1, state.player_y + 1) for state in solution]
+
+
+# state shared by the frames rendered in one worker process, set once by the pool initializer
+_job: dict = {}
+
+
+# the states are passed as plain lists, since pickling their chains would recurse once per step
+def _start_job(world: World,
+               times: list[int],
+               positions: list[tuple[int, int]],
+               tile_size: int,
+               template: tuple[str, str, str] | None) -> None:
+    _job.update(world=world, times=times, positions=positions, tile_size=tile_size, template=template)
+
+
+def _render_frame(index: int) -> str:
+    return _frame(_job["world"], _job["times"][index], _job["positions"][index], _job["tile_size"])
+
+
+def _write_frame(file_path: str, index: int) -> None:
+    head, middle, tail = _job["template"]
+    tile_size: int = _job["tile_size"]
+    with open(file_path, "w") as file:
+        file.write(head + _render_frame(index) + middle
+                   + _trajectory(_job["positions"][:index + 1], tile_size) + tail)
+
+
+# frame names in a sequence sort by step
+def frame_path(directory: str, index: int, frames: int) -> str:
+    return os.path.join(directory, f"frame_{index:0{len(str(frames - 1))}d}.svg")
+
+
+# writes one SVG file per step of the solution, rendered in a pool of worker processes
+def export_frames(world: World,
+                  solution: list[State],
+                  directory: str,
+                  tile_size: int = EXPORT_TILE_SIZE,
+                  workers: int | None = None) -> list[str]:
+    os.makedirs(directory, exist_ok=True)
+    paths: list[str] = [frame_path(directory, i, len(solution)) for i in range(len(solution))]
+    template: tuple[str, str, str] = _template(world, tile_size)
+    times: list[int] = [state.time for state in solution]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_job,
+                             initargs=(world, times, _positions(solution), tile_size, template)) as executor:
+        list(executor.map(_write_frame, paths, range(len(solution)), chunksize=_chunksize(len(solution), workers)))
+    return paths
+
+
+# only shown from key time start to key time stop (both fractions of the whole animation), in a loop
+def _show(start: float, stop: float | None, duration: float) -> str:
+    if start == 0 and stop is None:
+        return ""
+    values: list[str] = ["inline"] if start == 0 else ["none", "inline"]
+    key_times: list[float] = [0] if start == 0 else [0, start]
+    if stop is not None:
+        values.append("none")
+        key_times.append(stop)
+    return (f'<animate attributeName="display" values="{";".join(values)}" '
+            f'keyTimes="{";".join(f"{t:.6g}" for t in key_times)}" dur="{duration:.6g}s" '
+            f'calcMode="discrete" repeatCount="indefinite" />')
+
+
+# writes the whole solution as a single looping SVG animation. every step is a group that is only displayed
+# during its own time slot, and every trajectory segment appears at its step, so the file grows linearly
+def export_animation(world: World,
+                     solution: list[State],
+                     file_path: str,
+                     tile_size: int = EXPORT_TILE_SIZE,
+                     frame_duration: float = FRAME_DURATION,
+                     workers: int | None = None) -> None:
+    head, middle, tail = _template(world, tile_size)
+    count: int = len(solution)
+    duration: float = count * frame_duration
+    times: list[int] = [state.time for state in solution]
+    positions: list[tuple[int, int]] = _positions(solution)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_job,
+                             initargs=(world, times, positions, tile_size, None)) as executor:
+        frames: list[str] = list(executor.map(_render_frame, range(count), chunksize=_chunksize(count, workers)))
+
+    with open(file_path, "w") as file:
+        file.write(head)
+        for i, frame in enumerate(frames):
+            display: str = ' display="none"' if i > 0 else ""
+            stop: float | None = (i + 1) / count if i < count - 1 else None
+            file.write(f"<g{display}>{_show(i / count, stop, duration)}\n{frame}\n</g>\n")
+        file.write(middle)
+        for i in range(1, count):
+            file.write(f'<line x1="{positions[i - 1][0] * tile_size + tile_size // 2}" '
+                       f'y1="{positions[i - 1][1] * tile_size + tile_size // 2}" '
+                       f'x2="{positions[i][0] * tile_size + tile_size // 2}" '
+                       f'y2="{positions[i][1] * tile_size + tile_size // 2}" '
+                       f'stroke="#FF00FF" stroke-width="2" display="none">'
+                       f'{_show(i / count, None, duration)}</line>\n')
+        file.write(tail)
+
+
+# a few chunks per worker, so that workers do not wait for each other at the end
+def _chunksize(count: int, workers: int | None) -> int:
+    return max(1, count // ((workers or os.cpu_count() or 1) * 4))
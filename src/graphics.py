@@ -5,9 +5,11 @@ from typing import Optional
 from os import environ
 environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
 import pygame
-import drawsvg as dsvg
 
-from world import World
+from background import BackgroundSolve, Finished, PhaseSolved, Progress
+from export import save_frame
+from incremental import IncrementalBFS
+from world import DIRECTIONS, World
 from state import State
 
 
@@ -18,6 +20,19 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 PINK = (255, 0, 255)
 GRAY = (100, 100, 100)
+DARK_GRAY = (60, 60, 60)
+
+MAX_TILE_SIZE = 100
+# below this tile size, arrows cannot be told apart, so the map is drawn as a density view instead
+MIN_TILE_SIZE = 10
+
+# palette of the density view: floor, wall, gate and a cell with at least one blizzard
+DENSITY_PALETTE = [WHITE, BLACK, GRAY, DARK_GRAY]
+FLOOR_ROW = bytes.maketrans(b"01", b"\x00\x03")
+WALL_ROW = bytes.maketrans(b"01", b"\x01\x02")
+
+# blizzard a click turns a single blizzard (or an empty cell) into in manual mode, "" removes it
+NEXT_BLIZZARD: dict[str, str] = {"": ">", ">": "v", "v": "<", "<": "^", "^": ""}
 
 
 class Graphics():
@@ -29,15 +44,6 @@ class Graphics():
         pygame.init()
         MAX_SCREEN_WIDTH = pygame.display.Info().current_w
         MAX_SCREEN_HEIGHT = pygame.display.Info().current_h
-        MAX_TILE_SIZE = 100
-        MIN_TILE_SIZE = 10
-
-        if MAX_SCREEN_WIDTH / world.width + 2 < MIN_TILE_SIZE:
-            print("Error: World is too wide")
-            quit()
-        if MAX_SCREEN_HEIGHT / world.height + 2 < MIN_TILE_SIZE:
-            print("Error: World is too tall")
-            quit()
 
         self.world: World = world
         if player_x is not None and player_x < world.width and player_x >= 0:
@@ -49,253 +55,373 @@ class Graphics():
         else:
             self.player_y = 0
         self.trajectory: list[tuple[int, int]] = [(self.player_x, self.player_y)]
-        self.time: int = 0 # only used for manual mode
+        # the minute shown, the world itself is never stepped: blizzards are looked up by time
+        self.time: int = 0
 
         self.grid_width: int = world.width + 2 # +2 for walls
         self.grid_height: int = world.height + 2
+        # worlds that do not fit the screen at MIN_TILE_SIZE start as a density view, down to one pixel per cell
         self.tile_size: int = min(MAX_SCREEN_WIDTH // self.grid_width,
                                   MAX_SCREEN_HEIGHT // self.grid_height)
         if self.tile_size > MAX_TILE_SIZE:
             self.tile_size = MAX_TILE_SIZE
+        if self.tile_size < 1:
+            self.tile_size = 1
         
         self.margin: int = 5
         self.map_width: int = self.tile_size * self.grid_width
         self.map_height: int = self.tile_size * self.grid_height
-        self.status_width: int = self.map_width
+        # the part of the map on screen, which can be scrolled with the camera (the top left cell in view)
+        self.view_width: int = min(self.map_width, MAX_SCREEN_WIDTH)
+        self.view_height: int = min(self.map_height, MAX_SCREEN_HEIGHT)
+        self.camera_x: int = 0
+        self.camera_y: int = 0
+        self.status_width: int = self.view_width
         self.status_height: int = 50
-        self.screen_width: int = self.map_width + self.margin * 2
-        self.screen_height: int = self.map_height + self.status_height + self.margin * 2
+        self.screen_width: int = self.view_width + self.margin * 2
+        self.screen_height: int = self.view_height + self.status_height + self.margin * 2
 
-        self.map = pygame.Surface((self.map_width, self.map_height))
+        self.map = pygame.Surface((self.view_width, self.view_height))
         self.status = pygame.Surface((self.status_width, self.status_height))
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
         pygame.display.set_caption("Blizzard Basin")
         self.clock = pygame.time.Clock()
+        self._init_renderer()
 
-    def _draw_grid(self) -> None:
-        for i in range(self.grid_width):
-            pygame.draw.line(self.map, GRAY, (i * self.tile_size, 0),
-                             (i * self.tile_size, self.screen_height))
-        for i in range(self.grid_height):
-            pygame.draw.line(self.map, GRAY, (0, i * self.tile_size),
-                             (self.screen_width, i * self.tile_size))
-
-    def _draw_walls(self) -> None:
-        top_border = pygame.Rect(0, 0, self.grid_width * self.tile_size, self.tile_size)
-        bottom_border = pygame.Rect(0,
-                                    (self.grid_height - 1) * self.tile_size,
-                                    self.grid_width * self.tile_size,
-                                    self.tile_size)
-        left_border = pygame.Rect(0, 0, self.tile_size, self.grid_height * self.tile_size)
-        right_border = pygame.Rect((self.grid_width - 1) * self.tile_size,
-                                    0,
-                                    self.tile_size,
-                                    self.grid_height * self.tile_size)
-
-        pygame.draw.rect(self.map, BLACK, bottom_border)
-        pygame.draw.rect(self.map, BLACK, left_border)
-        pygame.draw.rect(self.map, BLACK, right_border)
-        pygame.draw.rect(self.map, BLACK, top_border)
-    
-    def _draw_entry_exit(self) -> None:
-        entry = pygame.Rect((self.world.entry_x + 1) * self.tile_size,
-                            0,
-                            self.tile_size,
-                            self.tile_size)
-        exit = pygame.Rect((self.world.exit_x + 1) * self.tile_size,
-                            (self.grid_height - 1) * self.tile_size,
-                            self.tile_size,
-                            self.tile_size)
-        pygame.draw.rect(self.map, GRAY, entry)
-        pygame.draw.rect(self.map, GRAY, exit)
-    
-    def _draw_player(self) -> None:
-        rect = pygame.Rect(self.player_x * self.tile_size,
-                            self.player_y * self.tile_size,
-                            self.tile_size,
-                            self.tile_size)
-        color = BLUE
-        if self.world.is_dead(self.player_x - 1, self.player_y - 1):
-            color = RED
-        elif self.world.is_solved(self.player_x - 1, self.player_y - 1):
-            color = GREEN
-        pygame.draw.rect(self.map, color, rect)
+    # tiles for the background of a cell and arrows for every combination of blizzards are drawn once per zoom
+    # level. every frame only redraws the visible cells that changed since the last one
+    def _init_renderer(self) -> None:
+        self.font_large = pygame.font.SysFont("Arial", 40)
+        self.font_small = pygame.font.SysFont("Arial", 25)
+        self.help_text = self.font_small.render("Spacebar: Step   Enter: Run/Pause   ESC: Quit", True, BLACK)
+        self.entry_mask: int = sum(1 << x for x in self.world.entries)
+        self.exit_mask: int = sum(1 << x for x in self.world.exits)
+        self._build_tiles()
+
+        # segments of the trajectory by the cells they cross, segment i ends at trajectory[i]
+        self.trajectory_cells: dict[tuple[int, int], list[int]] = {}
+        self.trajectory_drawn: int = 1
+        # the trajectory over the density view, only extended with the new segments until the view changes
+        self.trajectory_layer: pygame.Surface | None = None
+
+        # what is on screen: the view, blizzard flags by visible grid cell, and the player's cell and color
+        self.view_drawn: tuple[int, int, int] | None = None
+        self.cells: dict[tuple[int, int], int] = {}
+        self.cells_key: tuple[int, int] | None = None
+        self.player_drawn: tuple[int, int, tuple[int, int, int]] | None = None
+        self.player_followed: tuple[int, int] | None = None
+        self.status_time: tuple[int, str] | None = None
+        # shown below the controls, e.g. the progress of a background solve
+        self.message: str = ""
+        # manual mode: the search from the player's state, solved again after every edit of the blizzards
+        self.what_if: IncrementalBFS | None = None
+        self.dirty: list[pygame.Rect] = []
+
+    def _build_tiles(self) -> None:
+        # background of the floor, wall and gate cells, with the grid lines on their top and left edge
+        self.tiles: dict[tuple[int, int, int], pygame.Surface] = {}
+        for color in (WHITE, BLACK, GRAY):
+            tile = pygame.Surface((self.tile_size, self.tile_size))
+            tile.fill(color)
+            self._draw_grid_lines(tile)
+            self.tiles[color] = tile
+
+        # grid lines alone, drawn over the player and the blizzards
+        self.grid_tile = pygame.Surface((self.tile_size, self.tile_size), pygame.SRCALPHA)
+        self._draw_grid_lines(self.grid_tile)
+
+        # one sprite per combination of blizzard flags
+        self.sprites: list[pygame.Surface] = []
+        for cell in range(16):
+            sprite = pygame.Surface((self.tile_size, self.tile_size), pygame.SRCALPHA)
+            self._draw_arrows(sprite, self.tile_size // 2, self.tile_size // 2, cell)
+            self.sprites.append(sprite)
+
+    def _draw_grid_lines(self, tile: pygame.Surface) -> None:
+        pygame.draw.line(tile, GRAY, (0, 0), (0, self.tile_size))
+        pygame.draw.line(tile, GRAY, (0, 0), (self.tile_size, 0))
+
+    # background color of a grid cell
+    def _background(self, grid_x: int, grid_y: int) -> tuple[int, int, int]:
+        if grid_x == 0 or grid_x == self.grid_width - 1:
+            return BLACK
+        if grid_y == 0:
+            return GRAY if self.entry_mask >> (grid_x - 1) & 1 else BLACK
+        if grid_y == self.grid_height - 1:
+            return GRAY if self.exit_mask >> (grid_x - 1) & 1 else BLACK
+        return WHITE
+
+    def _player_color(self) -> tuple[int, int, int]:
+        if self.world.is_blocked_at(self.player_x - 1, self.player_y - 1, self.time):
+            return RED
+        if self.world.is_solved(self.player_x - 1, self.player_y - 1):
+            return GREEN
+        return BLUE
     
-    def _draw_blizzards(self) -> None:
-        for i in range(self.world.height):
-            for j in range(self.world.width):
-                center_x = ((j + 1) * self.tile_size) + self.tile_size // 2
-                center_y = ((i + 1) * self.tile_size) + self.tile_size // 2
-                if self.world.map[i][j] & 1:
-                    pygame.draw.line(self.map, BLACK,
-                                        (center_x, center_y),
-                                        (center_x - self.tile_size // 2, center_y))
-                    pygame.draw.polygon(self.map, BLACK,
-                                        [
-                                        (center_x - self.tile_size // 3, center_y - self.tile_size // 4),
-                                        (center_x - self.tile_size // 2, center_y),
-                                        (center_x - self.tile_size // 3, center_y + self.tile_size // 4)],
-                                        )
-                if self.world.map[i][j] & 2:
-                    pygame.draw.line(self.map, BLACK,
-                                        (center_x, center_y),
-                                        (center_x, center_y + self.tile_size // 2))
-                    pygame.draw.polygon(self.map, BLACK,
-                                        [
-                                        (center_x - self.tile_size // 4, center_y + self.tile_size // 3),
-                                        (center_x, center_y + self.tile_size // 2),
-                                        (center_x + self.tile_size // 4, center_y + self.tile_size // 3)],
-                                        )
-                if self.world.map[i][j] & 4:
-                    pygame.draw.line(self.map, BLACK,
-                                        (center_x, center_y),
-                                        (center_x + self.tile_size // 2, center_y))
-                    pygame.draw.polygon(self.map, BLACK,
-                                        [
-                                        (center_x + self.tile_size // 3, center_y - self.tile_size // 4),
-                                        (center_x + self.tile_size // 2, center_y),
-                                        (center_x + self.tile_size // 3, center_y + self.tile_size // 4)],
-                                        )
-                if self.world.map[i][j] & 8:
-                    pygame.draw.line(self.map, BLACK,
-                                        (center_x, center_y),
-                                        (center_x, center_y - self.tile_size // 2))
-                    pygame.draw.polygon(self.map, BLACK,
-                                        [
-                                        (center_x - self.tile_size // 4, center_y - self.tile_size // 3),
-                                        (center_x, center_y - self.tile_size // 2),
-                                        (center_x + self.tile_size // 4, center_y - self.tile_size // 3)],
-                                        )
+    def _draw_arrows(self, surface: pygame.Surface, center_x: int, center_y: int, cell: int) -> None:
+        if cell & 1:
+            pygame.draw.line(surface, BLACK,
+                                (center_x, center_y),
+                                (center_x - self.tile_size // 2, center_y))
+            pygame.draw.polygon(surface, BLACK,
+                                [
+                                (center_x - self.tile_size // 3, center_y - self.tile_size // 4),
+                                (center_x - self.tile_size // 2, center_y),
+                                (center_x - self.tile_size // 3, center_y + self.tile_size // 4)],
+                                )
+        if cell & 2:
+            pygame.draw.line(surface, BLACK,
+                                (center_x, center_y),
+                                (center_x, center_y + self.tile_size // 2))
+            pygame.draw.polygon(surface, BLACK,
+                                [
+                                (center_x - self.tile_size // 4, center_y + self.tile_size // 3),
+                                (center_x, center_y + self.tile_size // 2),
+                                (center_x + self.tile_size // 4, center_y + self.tile_size // 3)],
+                                )
+        if cell & 4:
+            pygame.draw.line(surface, BLACK,
+                                (center_x, center_y),
+                                (center_x + self.tile_size // 2, center_y))
+            pygame.draw.polygon(surface, BLACK,
+                                [
+                                (center_x + self.tile_size // 3, center_y - self.tile_size // 4),
+                                (center_x + self.tile_size // 2, center_y),
+                                (center_x + self.tile_size // 3, center_y + self.tile_size // 4)],
+                                )
+        if cell & 8:
+            pygame.draw.line(surface, BLACK,
+                                (center_x, center_y),
+                                (center_x, center_y - self.tile_size // 2))
+            pygame.draw.polygon(surface, BLACK,
+                                [
+                                (center_x - self.tile_size // 4, center_y - self.tile_size // 3),
+                                (center_x, center_y - self.tile_size // 2),
+                                (center_x + self.tile_size // 4, center_y - self.tile_size // 3)],
+                                )
     
-    def _draw_trajectory(self) -> None:
-        for i in range(len(self.trajectory) - 1):
-            pygame.draw.line(self.map, PINK,
-                            (self.trajectory[i][0] * self.tile_size + self.tile_size // 2,
-                             self.trajectory[i][1] * self.tile_size + self.tile_size // 2),
-                            (self.trajectory[i + 1][0] * self.tile_size + self.tile_size // 2,
-                             self.trajectory[i + 1][1] * self.tile_size + self.tile_size // 2),
-                            width=2)
+    # grid cells in view, including the ones only partly visible
+    def _visible(self) -> tuple[range, range]:
+        columns = range(self.camera_x, min(self.grid_width, self.camera_x - (-self.view_width // self.tile_size)))
+        rows = range(self.camera_y, min(self.grid_height, self.camera_y - (-self.view_height // self.tile_size)))
+        return columns, rows
+
+    def _cell_rect(self, grid_x: int, grid_y: int) -> pygame.Rect:
+        return pygame.Rect((grid_x - self.camera_x) * self.tile_size, (grid_y - self.camera_y) * self.tile_size,
+                           self.tile_size, self.tile_size)
+
+    def _trajectory_point(self, index: int) -> tuple[int, int]:
+        return ((self.trajectory[index][0] - self.camera_x) * self.tile_size + self.tile_size // 2,
+                (self.trajectory[index][1] - self.camera_y) * self.tile_size + self.tile_size // 2)
+
+    # redraws one cell of the grid (walls included) from the tiles
+    def _draw_cell(self, grid_x: int, grid_y: int) -> None:
+        rect = self._cell_rect(grid_x, grid_y)
+        self.map.blit(self.tiles[self._background(grid_x, grid_y)], rect)
+        if self.player_drawn is not None and self.player_drawn[:2] == (grid_x, grid_y):
+            pygame.draw.rect(self.map, self.player_drawn[2], rect)
+        cell = self.cells.get((grid_x, grid_y), 0)
+        if cell:
+            self.map.blit(self.sprites[cell], rect)
+        self.map.blit(self.grid_tile, rect)
+        segments = self.trajectory_cells.get((grid_x, grid_y))
+        if segments:
+            self.map.set_clip(rect)
+            for i in segments:
+                pygame.draw.line(self.map, PINK, self._trajectory_point(i - 1), self._trajectory_point(i), width=2)
+            self.map.set_clip(None)
+        self.dirty.append(rect.move(self.margin, self.margin))
+
+    # blizzard flags of the visible cells, from the occupancy index of the world at the current minute
+    def _visible_blizzards(self) -> dict[tuple[int, int], int]:
+        time: int = self.time
+        columns, rows = self._visible()
+        cells: dict[tuple[int, int], int] = {}
+        for grid_y in rows:
+            if grid_y == 0 or grid_y == self.grid_height - 1:
+                continue
+            blocked: int = self.world.blocked_row(grid_y - 1, time)
+            for grid_x in columns:
+                if 0 < grid_x < self.grid_width - 1 and blocked >> (grid_x - 1) & 1:
+                    cells[(grid_x, grid_y)] = self.world.cell_at(grid_x - 1, grid_y - 1, time)
+        return cells
+
+    def _update_player(self) -> set[tuple[int, int]]:
+        player = (self.player_x, self.player_y, self._player_color())
+        if player == self.player_drawn:
+            return set()
+        changed = {player[:2]}
+        if self.player_drawn is not None:
+            changed.add(self.player_drawn[:2])
+        self.player_drawn = player
+        return changed
+
+    def _update_trajectory(self) -> set[tuple[int, int]]:
+        changed: set[tuple[int, int]] = set()
+        for i in range(self.trajectory_drawn, len(self.trajectory)):
+            for cell in {self.trajectory[i - 1], self.trajectory[i]}:
+                self.trajectory_cells.setdefault(cell, []).append(i)
+                changed.add(cell)
+        self.trajectory_drawn = len(self.trajectory)
+        return changed
+
+    # draws the visible cells that changed, or all of them after the view changed
+    def _draw_tiles(self, redraw: bool) -> None:
+        changed = self._update_player() | self._update_trajectory()
+        key = (self.time, len(self.world.edits))
+        if redraw or key != self.cells_key:
+            self.cells_key = key
+            cells = self._visible_blizzards()
+            changed.update(position for position, cell in cells.items() if self.cells.get(position) != cell)
+            changed.update(position for position in self.cells if position not in cells)
+            self.cells = cells
+        columns, rows = self._visible()
+        if redraw:
+            changed = {(grid_x, grid_y) for grid_y in rows for grid_x in columns}
+        for grid_x, grid_y in changed:
+            if grid_x in columns and grid_y in rows:
+                self._draw_cell(grid_x, grid_y)
+
+    # one pixel per visible cell, scaled to the tile size: each row is built from the occupancy bitmask at once
+    def _draw_density(self, redraw: bool) -> None:
+        new_segments: int = self.trajectory_drawn
+        changed = self._update_player() | self._update_trajectory()
+        key = (self.time, len(self.world.edits))
+        if not redraw and not changed and key == self.cells_key:
+            return
+        self.cells_key = key
+        self.cells = {}
+        columns, rows = self._visible()
+        data: bytes = b"".join(self._density_row(grid_y, columns) for grid_y in rows)
+        image = pygame.image.frombuffer(data, (len(columns), len(rows)), "P")
+        image.set_palette(DENSITY_PALETTE)
+        self.map.fill(WHITE)
+        self.map.blit(pygame.transform.scale(image, (len(columns) * self.tile_size, len(rows) * self.tile_size)),
+                      (0, 0))
+
+        pygame.draw.rect(self.map, self.player_drawn[2], self._cell_rect(self.player_x, self.player_y))
+        if redraw or self.trajectory_layer is None:
+            self.trajectory_layer = pygame.Surface((self.view_width, self.view_height), pygame.SRCALPHA)
+            new_segments = 1
+        for i in range(new_segments, len(self.trajectory)):
+            pygame.draw.line(self.trajectory_layer, PINK, self._trajectory_point(i - 1), self._trajectory_point(i))
+        self.map.blit(self.trajectory_layer, (0, 0))
+        self.dirty.append(pygame.Rect(self.margin, self.margin, self.view_width, self.view_height))
+
+    # palette indices of the visible cells in a grid row
+    def _density_row(self, grid_y: int, columns: range) -> bytes:
+        if grid_y == 0:
+            mask, table = self.entry_mask, WALL_ROW
+        elif grid_y == self.grid_height - 1:
+            mask, table = self.exit_mask, WALL_ROW
+        else:
+            mask, table = self.world.blocked_row(grid_y - 1, self.time), FLOOR_ROW
+        # x of the first visible column, -1 for the left wall
+        first: int = columns.start - 1
+        low: int = max(first, 0)
+        high: int = min(first + len(columns), self.world.width)
+        row: bytes = b"\x01" if first < 0 else b""
+        if high > low:
+            bits: int = mask >> low & ((1 << (high - low)) - 1)
+            row += format(bits, f"0{high - low}b")[::-1].encode().translate(table)
+        if first + len(columns) > self.world.width:
+            row += b"\x01"
+        return row
 
     def _draw_status(self) -> None:
+        if (self.time, self.message) == self.status_time:
+            return
+        self.status_time = (self.time, self.message)
         self.status.fill(WHITE)
-        font = pygame.font.SysFont("Arial", 40)
-        text = font.render(f"Step: {self.time}", True, BLACK)
+        text = self.font_large.render(f"Step: {self.time}", True, BLACK)
         self.status.blit(text, (0, 0))
+        self.status.blit(self.help_text, (180, 0))
+        if self.message:
+            self.status.blit(self.font_small.render(self.message, True, BLACK), (180, 25))
+        self.screen.blit(self.status, (self.margin, self.view_height + self.margin))
+        self.dirty.append(pygame.Rect(self.margin, self.view_height + self.margin,
+                                      self.status_width, self.status_height))
 
-        font = pygame.font.SysFont("Arial", 25)
-        text = font.render("Spacebar: Step   Enter: Run/Pause   ESC: Quit", True, BLACK)
-        self.status.blit(text, (180, 0))
+    # keeps the camera within the map
+    def _move_camera(self, camera_x: int, camera_y: int) -> None:
+        self.camera_x = max(0, min(camera_x, self.grid_width - self.view_width // self.tile_size))
+        self.camera_y = max(0, min(camera_y, self.grid_height - self.view_height // self.tile_size))
+
+    # centres the camera on the player when a move takes them out of view
+    def _follow_player(self) -> None:
+        if (self.player_x, self.player_y) == self.player_followed:
+            return
+        self.player_followed = (self.player_x, self.player_y)
+        columns: int = self.view_width // self.tile_size
+        rows: int = self.view_height // self.tile_size
+        if not (self.camera_x <= self.player_x < self.camera_x + columns
+                and self.camera_y <= self.player_y < self.camera_y + rows):
+            self._move_camera(self.player_x - columns // 2, self.player_y - rows // 2)
+
+    # zooms in or out around the centre of the view
+    def _zoom(self, zoom_in: bool) -> None:
+        if zoom_in:
+            tile_size = min(MAX_TILE_SIZE, max(self.tile_size + 1, self.tile_size * 5 // 4))
+        else:
+            tile_size = max(1, self.tile_size * 4 // 5)
+        if tile_size == self.tile_size:
+            return
+        center_x: float = self.camera_x + self.view_width / self.tile_size / 2
+        center_y: float = self.camera_y + self.view_height / self.tile_size / 2
+        self.tile_size = tile_size
+        self.map_width = self.tile_size * self.grid_width
+        self.map_height = self.tile_size * self.grid_height
+        self._build_tiles()
+        self._move_camera(int(center_x - self.view_width / self.tile_size / 2),
+                          int(center_y - self.view_height / self.tile_size / 2))
+
+    # scrolling and zooming, the same in both modes
+    def _handle_view_event(self, event: pygame.event.Event) -> None:
+        if event.type == pygame.MOUSEWHEEL:
+            self._zoom(event.y > 0)
+        elif event.type == pygame.KEYDOWN:
+            step_x: int = max(1, self.view_width // self.tile_size // 4)
+            step_y: int = max(1, self.view_height // self.tile_size // 4)
+            if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self._zoom(True)
+            elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self._zoom(False)
+            elif event.key == pygame.K_a:
+                self._move_camera(self.camera_x - step_x, self.camera_y)
+            elif event.key == pygame.K_d:
+                self._move_camera(self.camera_x + step_x, self.camera_y)
+            elif event.key == pygame.K_w:
+                self._move_camera(self.camera_x, self.camera_y - step_y)
+            elif event.key == pygame.K_s:
+                self._move_camera(self.camera_x, self.camera_y + step_y)
 
     def _draw_all(self) -> None:
-        self.map.fill(WHITE)
-        self.screen.fill(WHITE)
-        self._draw_walls()
-        self._draw_entry_exit()
-        self._draw_player()
-        self._draw_blizzards()
-        self._draw_grid()
-        self._draw_trajectory()
+        self._follow_player()
+        view = (self.camera_x, self.camera_y, self.tile_size)
+        redraw: bool = view != self.view_drawn
+        self.view_drawn = view
+        if self.tile_size < MIN_TILE_SIZE:
+            self._draw_density(redraw)
+        else:
+            self._draw_tiles(redraw)
+        if redraw:
+            self.screen.fill(WHITE)
+            self.screen.blit(self.map, (self.margin, self.margin))
+            self.status_time = None
+        else:
+            for rect in self.dirty:
+                self.screen.blit(self.map, rect, rect.move(-self.margin, -self.margin))
         self._draw_status()
-        self.screen.blit(self.map, (self.margin, self.margin))
-        self.screen.blit(self.status, (self.margin, self.map_height + self.margin))
-        pygame.display.flip()
+        if redraw:
+            pygame.display.flip()
+        elif self.dirty:
+            pygame.display.update(self.dirty)
+        self.dirty = []
     
+    # the arrows are drawn at least at MIN_TILE_SIZE, also when the window shows a density view
     def draw_svg(self, filename: str) -> None:
-        svg = dsvg.Drawing(self.map_width, self.map_height)
-        svg.append(dsvg.Rectangle(0, 0, self.map_width, self.map_height, fill='white'))
-
-        # Draw walls
-        top_border = dsvg.Rectangle(0, 0, self.map_width, self.tile_size, fill='black')
-        bottom_border = dsvg.Rectangle(0, (self.grid_height - 1) * self.tile_size,
-                                       self.map_width, self.tile_size, fill='black')
-        left_border = dsvg.Rectangle(0, 0, self.tile_size, self.map_height, fill='black')
-        right_border = dsvg.Rectangle((self.grid_width - 1) * self.tile_size, 0,
-                                       self.tile_size, self.map_height, fill='black')
-        svg.append(top_border)
-        svg.append(bottom_border)
-        svg.append(left_border)
-        svg.append(right_border)
-
-        # Draw entry and exit
-        entry = dsvg.Rectangle((self.world.entry_x + 1) * self.tile_size, 0,
-                               self.tile_size, self.tile_size, fill="#A3A3A3")
-        exit = dsvg.Rectangle((self.world.exit_x + 1) * self.tile_size,
-                               (self.grid_height - 1) * self.tile_size,
-                               self.tile_size, self.tile_size, fill='#A3A3A3')
-        svg.append(entry)
-        svg.append(exit)
-        # Draw player
-        player_rect = dsvg.Rectangle(self.player_x * self.tile_size,
-                                     self.player_y * self.tile_size,
-                                     self.tile_size, self.tile_size,
-                                     fill='blue')
-        svg.append(player_rect)
-
-        # Draw blizzards
-        for i in range(self.world.height):
-            for j in range(self.world.width):
-                center_x = ((j + 1) * self.tile_size) + self.tile_size // 2
-                center_y = ((i + 1) * self.tile_size) + self.tile_size // 2
-                if self.world.map[i][j] & 1:
-                    svg.append(dsvg.Line(center_x + 1, center_y,
-                                         center_x - self.tile_size // 2.2, center_y,
-                                         stroke='black', stroke_width=2))
-                    svg.append(dsvg.Lines(center_x - self.tile_size // 3, center_y - self.tile_size // 4,
-                                         center_x - self.tile_size // 2 + 0.5, center_y,
-                                        center_x - self.tile_size // 3, center_y + self.tile_size // 4,
-                                        close=True,
-                                            stroke='none',
-                                             fill='black'))
-                if self.world.map[i][j] & 2:
-                    svg.append(dsvg.Line(center_x, center_y - 1,
-                                         center_x, center_y + self.tile_size // 2.2,
-                                         stroke='black', stroke_width=2))
-                    svg.append(dsvg.Lines(center_x - self.tile_size // 4, center_y + self.tile_size // 3,
-                                         center_x, center_y + self.tile_size // 2 - 0.5,
-                                         center_x + self.tile_size // 4, center_y + self.tile_size // 3,
-                                         close=True,
-                                             stroke='none',
-                                             fill='black'))
-                if self.world.map[i][j] & 4:
-                    svg.append(dsvg.Line(center_x + 1, center_y,
-                                         center_x + self.tile_size // 2.2, center_y,
-                                         stroke='black', stroke_width=2))
-                    svg.append(dsvg.Lines(center_x + self.tile_size // 3, center_y - self.tile_size // 4,
-                                         center_x + self.tile_size // 2 - 0.5, center_y,
-                                         center_x + self.tile_size // 3, center_y + self.tile_size // 4,
-                                         close=True,
-                                             stroke='none',
-                                             fill='black'))
-                if self.world.map[i][j] & 8:
-                    svg.append(dsvg.Line(center_x, center_y + 1,
-                                         center_x, center_y - self.tile_size // 2.2,
-                                         stroke='black', stroke_width=2))
-                    svg.append(dsvg.Lines(center_x - self.tile_size // 4, center_y - self.tile_size // 3,
-                                         center_x, center_y - self.tile_size // 2 + 0.5,
-                                         center_x + self.tile_size // 4, center_y - self.tile_size // 3,
-                                         close=True,
-                                             stroke='none',
-                                             fill='black'))
-        
-        # Draw grid
-        for i in range(self.grid_width + 1):
-            svg.append(dsvg.Line(i * self.tile_size, 0,
-                                 i * self.tile_size, self.map_height,
-                                 stroke='gray', stroke_width=1))
-        for i in range(self.grid_height + 1):
-            svg.append(dsvg.Line(0, i * self.tile_size,
-                                 self.map_width, i * self.tile_size,
-                                 stroke='gray', stroke_width=1))
-        
-        # Draw trajectory
-        for i in range(len(self.trajectory) - 1):
-            svg.append(dsvg.Line(self.trajectory[i][0] * self.tile_size + self.tile_size // 2,
-                                 self.trajectory[i][1] * self.tile_size + self.tile_size // 2,
-                                 self.trajectory[i + 1][0] * self.tile_size + self.tile_size // 2,
-                                 self.trajectory[i + 1][1] * self.tile_size + self.tile_size // 2,
-                                 stroke='#FF00FF', stroke_width=2))
-
-        svg.save_svg(filename)
+        save_frame(self.world, self.time, (self.player_x, self.player_y), self.trajectory, filename,
+                   max(self.tile_size, MIN_TILE_SIZE))
 
     # manual mode
     def _move_player(self, dx: int, dy: int) -> None:
@@ -305,40 +431,105 @@ class Graphics():
             return
         if new_y < 0 or new_y >= self.grid_height:
             return
-        if new_y == 0 and new_x != self.world.entry_x + 1:
+        if new_y == 0 and new_x - 1 not in self.world.entries:
             return
-        if new_y == self.grid_height - 1 and new_x != self.world.exit_x + 1:
+        if new_y == self.grid_height - 1 and new_x - 1 not in self.world.exits:
             return
         self.player_x = new_x
         self.player_y = new_y
         self.trajectory.append((self.player_x, self.player_y))
-        self.world.step()
         self.time += 1
     
+    # cycles the blizzard in the clicked cell, a cell with several blizzards is cleared
+    def _edit_cell(self, position: tuple[int, int]) -> None:
+        if not self.map.get_rect().collidepoint(position[0] - self.margin, position[1] - self.margin):
+            return
+        x: int = (position[0] - self.margin) // self.tile_size + self.camera_x - 1
+        y: int = (position[1] - self.margin) // self.tile_size + self.camera_y - 1
+        if x < 0 or x >= self.world.width or y < 0 or y >= self.world.height:
+            return
+        time: int = self.time
+        cell: int = self.world.cell_at(x, y, time)
+        directions: list[str] = [d for d, flag in DIRECTIONS.items() if cell & flag]
+        for direction in directions:
+            self.world.remove_blizzard(x, y, direction, time)
+        if len(directions) <= 1:
+            new_direction: str = NEXT_BLIZZARD[directions[0] if directions else ""]
+            if new_direction:
+                self.world.add_blizzard(x, y, new_direction, time)
+        self._show_what_if()
+
+    # the earliest exit from the player's state with the edited blizzards, only the minutes the edits can change
+    # are searched again while the player stays put
+    def _show_what_if(self) -> None:
+        state: State = State(player_x = self.player_x - 1, player_y = self.player_y - 1, time = self.time)
+        if self.what_if is None or self.what_if.initial_state != state:
+            self.what_if = IncrementalBFS(self.world, state)
+            arrival: State | None = self.what_if.solve()
+        else:
+            arrival = self.what_if.resolve()
+        if arrival is None:
+            self.message = "No way out from here"
+        else:
+            self.message = f"Earliest exit from here: step {arrival.time} (layers reused: {self.what_if.reused})"
+
     def _step(self, step: State) -> None:
         self.player_x = step.player_x + 1
         self.player_y = step.player_y + 1
         self.trajectory.append((self.player_x, self.player_y))
-        self.world.step()
         self.time += 1
     
     def run(self, steps: Iterable[State]) -> None:
-        if not steps:
+        states: list[State] = list(steps)
+        if not states:
             print("No steps to run.")
             return
-        iterator = iter(steps)
-        step: State = next(iterator)
-        self.player_x = step.player_x + 1
-        self.player_y = step.player_y + 1
-        self.trajectory.append((self.player_x, self.player_y))
+        self._replay(states, None)
+
+    # opens the window while the job is still solving, and replays the solution as far as it is known
+    def run_background(self, job: BackgroundSolve) -> None:
+        self.message = "Solving..."
+        self._replay([], job)
+        job.cancel()
+
+    # adds the states of newly solved phases to the replay, and shows the progress of the job
+    def _poll(self, job: BackgroundSolve, states: list[State]) -> None:
+        for event in job.poll():
+            if isinstance(event, Progress):
+                self.message = f"Solving phase {event.phase}: minute {event.time}, frontier {event.frontier}"
+                if event.best is not None:
+                    self.message += f", best so far {event.best}"
+            elif isinstance(event, PhaseSolved):
+                path: list[State] = []
+                state: State | None = event.state
+                while state is not None:
+                    path.append(state)
+                    state = state.previous
+                path.reverse()
+                # every phase starts where the last one ended, so its path extends the one known so far
+                states.extend(path[len(states):])
+                self.message = f"Phase {event.phase} solved in {event.state.time} steps"
+            elif isinstance(event, Finished):
+                self.message = event.failure if event.failure is not None else f"Solved in {event.state.time} steps"
+
+    # replays the states, which may grow while the replay is running if a job is given
+    def _replay(self, states: list[State], job: BackgroundSolve | None) -> None:
+        index: int = 0
+        if states:
+            self.player_x = states[0].player_x + 1
+            self.player_y = states[0].player_y + 1
+            self.trajectory.append((self.player_x, self.player_y))
 
         autorun = False
-        finished = False
         running = True
         while running:
+            if job is not None:
+                self._poll(job, states)
             self._draw_all()
+            finished: bool = index + 1 >= len(states) and (job is None or job.finished is not None)
 
             for event in pygame.event.get():
+                self._handle_view_event(event)
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     return
@@ -347,13 +538,9 @@ class Graphics():
                         running = False
                         break
                     elif event.key == pygame.K_SPACE:
-                        if not autorun and not finished:
-                            try:
-                                step = next(iterator)
-                                self._step(step)
-                            except StopIteration:
-                                finished = True
-                                break
+                        if not autorun and index + 1 < len(states):
+                            index += 1
+                            self._step(states[index])
                     elif event.key == pygame.K_RETURN:
                         if not finished:
                             autorun = not autorun
@@ -361,12 +548,9 @@ class Graphics():
                         print("Saving current frame to output.svg")
                         self.draw_svg("output.svg")
 
-            if autorun and not finished:
-                try:
-                    step = next(iterator)
-                    self._step(step)
-                except StopIteration:
-                    finished = True
+            if autorun and index + 1 < len(states):
+                index += 1
+                self._step(states[index])
             self.clock.tick(60)
         pygame.quit()
 
@@ -376,6 +560,7 @@ class Graphics():
             self._draw_all()
 
             for event in pygame.event.get():
+                self._handle_view_event(event)
                 if event.type == pygame.QUIT:
                     running = False
                     break
@@ -389,7 +574,6 @@ class Graphics():
                     elif event.key == pygame.K_DOWN:
                         self._move_player(0, 1)
                     elif event.key == pygame.K_SPACE:
-                        self.world.step()
                         self.time += 1
                     elif event.key == pygame.K_x:
                         print("Saving current frame to output.svg")
@@ -397,6 +581,8 @@ class Graphics():
                     elif event.key == pygame.K_ESCAPE:
                         running = False
                         break
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    self._edit_cell(event.pos)
 
             self.clock.tick(60)
 
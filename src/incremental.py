@@ -0,0 +1,72 @@
+from bitset import BitsetBFS
+from state import State
+from world import World
+
+
+# bitset BFS that can be solved again after the blizzards of the world were edited
+# every layer before the first minute an edit can change is kept, so small edits only cost a short search
+class IncrementalBFS(BitsetBFS):
+    def __init__(self,
+                world: World,
+                initial_state: State) -> None:
+        super().__init__(world, initial_state)
+        self.forward: bool = True
+        # layers kept from the previous search by the last resolve
+        self.reused: int = 0
+        self._result: State | None = None
+        self._edits_seen: int = len(world.edits)
+
+    def solve(self, forward: bool = True) -> State | None:
+        self.forward = forward
+        self.reused = 0
+        self._edits_seen = len(self.world.edits)
+        self._snapshots = {}
+        self._result = super().solve(forward)
+        return self._result
+
+    # solves again, in the same direction, after blizzards were added to or removed from the world.
+    # initial_state can replace the initial state by an equal one reached by another path, e.g. when an earlier
+    # phase changed: the layers stay valid, only the path is rebuilt
+    def resolve(self, initial_state: State | None = None) -> State | None:
+        relinked: bool = initial_state is not None and initial_state is not self.initial_state
+        if initial_state is not None:
+            if initial_state != self.initial_state:
+                raise ValueError("The initial state must be at the same position and time")
+            self.initial_state = initial_state
+        if not self.layers:
+            return self.solve(self.forward)
+        edits: list[tuple[int, int, int]] = self.world.edits[self._edits_seen:]
+        self._edits_seen = len(self.world.edits)
+        first: int = min((self._first_affected(*edit) for edit in edits), default=len(self.layers))
+        self.reused = first
+        self.expanded = 0
+        if first == len(self.layers):
+            if relinked and self._result is not None:
+                self._result = self._walk_back(self._result.player_x, self._result.player_y)
+            return self._result
+        if first == 0:
+            return self.solve(self.forward)
+
+        # the search continues from the last layer that is still valid
+        del self.layers[first:]
+        start: int = self.initial_state.time + first
+        self._snapshots = {reachable: time for reachable, time in self._snapshots.items() if time < start}
+        self.no_solution = None
+        self._result = self._search(self.forward)
+        return self._result
+
+    # index of the first layer that can change with the blizzard edited at x, y on the initial map:
+    # the blizzard is in one cell per minute, which only matters if that cell can be reached from the layer before
+    def _first_affected(self, x: int, y: int, flag: int) -> int:
+        time: int = self.initial_state.time
+        if self.world.blizzard_origin(x, y, flag, -time) == (self.initial_state.player_x, self.initial_state.player_y):
+            return 0
+        for i in range(1, len(self.layers)):
+            blizzard_x, blizzard_y = self.world.blizzard_origin(x, y, flag, -(time + i))
+            layer: list[int] = self.layers[i - 1]
+            r: int = blizzard_y + 1
+            reach: int = layer[r - 1] | layer[r] | layer[r + 1]
+            reach |= (layer[r] << 1) | (layer[r] >> 1)
+            if reach >> blizzard_x & 1:
+                return i
+        return len(self.layers)
@@ -0,0 +1,89 @@
+
+from state import State
+from solver import NoSolution, Solver
+from world import NeighbourTable, World
+
+
+# waypoints for a trip going back and forth between the entry and the exit, starting at the entry
+def alternating_waypoints(world: World, legs: int) -> list[tuple[int, int]]:
+    waypoints: list[tuple[int, int]] = []
+    for leg in range(legs):
+        if leg % 2 == 0:
+            waypoints.append((world.exit_x, world.height))
+        else:
+            waypoints.append((world.entry_x, -1))
+    return waypoints
+
+
+# BFS over all legs of an itinerary at once, with the index of the current leg as part of the state
+class Itinerary(Solver):
+    def __init__(self,
+                world: World,
+                initial_state: State,
+                waypoints: list[tuple[int, int]]) -> None:
+        self.world = world
+        self.initial_state = initial_state
+        self.waypoints = waypoints
+        self.layer: dict[tuple[int, int, int], State] = {}
+        self.expanded = 0
+        self.no_solution = None
+        self._snapshots = {}
+
+    # the player can always wait on the entry and the exit, so reaching one of them is never worse than
+    # reaching it later: all states still on an earlier leg can be dropped
+    def _is_safe(self, waypoint: tuple[int, int]) -> bool:
+        return waypoint[1] == -1 or waypoint[1] == self.world.height
+
+    # index of the leg after the given position, skipping every waypoint reached there
+    def _advance(self, player_x: int, player_y: int, leg: int) -> int:
+        while leg < len(self.waypoints) and self.waypoints[leg] == (player_x, player_y):
+            leg += 1
+        return leg
+
+    # returns the state at the last waypoint if the whole itinerary can be travelled, otherwise None
+    # the waypoints define the direction of every leg, so forward is ignored
+    def solve(self, forward: bool = True) -> State | None:
+        state: State = self.initial_state
+        if self.world.is_blocked_at(state.player_x, state.player_y, state.time):
+            self.no_solution = NoSolution(state.time, 0)
+            return None
+        leg: int = self._advance(state.player_x, state.player_y, 0)
+        self.layer = {(state.player_x, state.player_y, leg): state}
+        min_leg: int = 0
+        table: NeighbourTable = self.world.neighbour_table()
+        width: int = self.world.width
+        time: int = state.time
+
+        while self.layer:
+            for (player_x, player_y, leg), state in self.layer.items():
+                if leg == len(self.waypoints):
+                    return state
+
+            time += 1
+            # blizzards of the next minute, shared by every leg
+            blocked: list[int] = self._blocked_rows(time)
+            next_layer: dict[tuple[int, int, int], State] = {}
+            for (player_x, player_y, leg), state in self.layer.items():
+                if leg < min_leg:
+                    continue
+                self.expanded += 1
+                cell: int = (player_y + 1) * width + player_x
+                for i in range(table.start[cell], table.start[cell + 1]):
+                    next_cell: int = table.neighbours[i]
+                    x: int = table.xs[next_cell]
+                    y: int = table.ys[next_cell]
+                    if 0 <= y < self.world.height and blocked[y] >> x & 1:
+                        continue
+                    next_state: State = State(x, y, time, state)
+                    next_leg: int = self._advance(x, y, leg)
+                    if next_leg > leg and self._is_safe(self.waypoints[next_leg - 1]):
+                        min_leg = max(min_leg, next_leg)
+                    next_layer.setdefault((x, y, next_leg), next_state)
+            if self.stats is not None:
+                self.stats.layer(time, len(next_layer), len(next_layer))
+            self.layer = next_layer
+            if time % self.world.period == 0 and self._repeats(
+                    time, frozenset(key for key in next_layer if key[2] >= min_leg)):
+                return None
+        self.no_solution = NoSolution(time, 0)
+        return None
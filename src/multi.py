@@ -0,0 +1,89 @@
+from collections.abc import Iterable
+
+from bitset import BitsetBFS
+from solver import NoSolution
+from state import State
+from world import World
+
+
+# bitset BFS from several sources to several goals at once
+# sources may start at different times: each one joins the frontier at its own minute.
+# the earliest arrival at every goal is kept, each as a state chain back to the source it came from
+class MultiSourceBFS(BitsetBFS):
+    def __init__(self,
+                world: World,
+                sources: Iterable[State],
+                goals: Iterable[tuple[int, int]]) -> None:
+        self.sources: list[State] = sorted(sources, key=lambda source: source.time)
+        if not self.sources:
+            raise ValueError("There must be at least one source")
+        super().__init__(world, self.sources[0])
+        self.goals: list[tuple[int, int]] = list(goals)
+        self.arrivals: dict[tuple[int, int], State] = {}
+        # sources by the minute they join the frontier, as an offset into layers
+        self._injected: dict[int, dict[tuple[int, int], State]] = {}
+
+    # returns the earliest arrival at any goal, otherwise None
+    # the goals define the direction, so forward is ignored. arrivals holds the earliest state at every goal reached
+    def solve(self, forward: bool = True) -> State | None:
+        start: int = self.sources[0].time
+        last_start: int = self.sources[-1].time
+        for source in self.sources:
+            if not self.world.is_blocked_at(source.player_x, source.player_y, source.time):
+                self._injected.setdefault(source.time - start, {}).setdefault(
+                    (source.player_x, source.player_y), source)
+
+        time: int = start
+        frontier: list[int] = [0] * self.rows
+        self.layers = []
+        while True:
+            for x, y in self._injected.get(time - start, {}):
+                frontier[y + 1] |= 1 << x
+            self.layers.append(frontier)
+
+            for x, y in self.goals:
+                if (x, y) not in self.arrivals and frontier[y + 1] >> x & 1:
+                    self.arrivals[(x, y)] = self._walk_back(x, y)
+            if len(self.arrivals) == len(self.goals):
+                break
+            if not any(frontier) and time >= last_start:
+                if not self.arrivals:
+                    self.no_solution = NoSolution(time, 0)
+                break
+
+            frontier_size: int = sum(row.bit_count() for row in frontier)
+            self.expanded += frontier_size
+            if self.stats is not None:
+                self.stats.layer(time, frontier_size, frontier_size)
+            time += 1
+            frontier = self._expand(frontier, time)
+            # once every source has joined, the search only depends on the frontier and the blizzards
+            if time > last_start and time % self.world.period == 0 and self._repeats(time, tuple(frontier)):
+                break
+
+        if not self.arrivals:
+            return None
+        self.no_solution = None
+        return min(self.arrivals.values(), key=lambda state: state.time)
+
+    # rebuild the state chain from the last layer back to the source the position was reached from
+    def _walk_back(self, player_x: int, player_y: int) -> State:
+        positions: list[tuple[int, int]] = []
+        index: int = len(self.layers) - 1
+        source: State | None = self._injected.get(index, {}).get((player_x, player_y))
+        while source is None:
+            positions.append((player_x, player_y))
+            index -= 1
+            layer: list[int] = self.layers[index]
+            for dx, dy in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+                x: int = player_x + dx
+                r: int = player_y + dy + 1
+                if x >= 0 and 0 <= r < self.rows and layer[r] >> x & 1:
+                    player_x, player_y = x, r - 1
+                    break
+            source = self._injected.get(index, {}).get((player_x, player_y))
+
+        state: State = source
+        for x, y in reversed(positions):
+            state = State(player_x=x, player_y=y, time=state.time + 1, previous=state)
+        return state
@@ -0,0 +1,87 @@
+import numpy as np
+
+from world import World
+
+
+# symbol for each combination of blizzard flags, as drawn by World.draw
+SYMBOLS = np.array([".", "<", "v", "2", ">", "2", "2", "3",
+                    "^", "2", "2", "3", "2", "3", "3", "4"])
+
+
+# World with the blizzards stored as four boolean planes, one per direction
+# the map attribute is still available as nested lists, but is rebuilt on every access
+class NumpyWorld(World):
+    @property
+    def map(self) -> list[list[int]]:
+        return self.flags().tolist()
+
+    @map.setter
+    def map(self, map: list[list[int]]) -> None:
+        cells = np.asarray(map, dtype=np.uint8)
+        self.left = (cells & 1) != 0   # '<'
+        self.down = (cells & 2) != 0   # 'v'
+        self.right = (cells & 4) != 0  # '>'
+        self.up = (cells & 8) != 0     # '^'
+
+    # 4-bit blizzard flags of every cell, at the current step or at the given time
+    def flags(self, time: int | None = None) -> np.ndarray:
+        left, down, right, up = self.left, self.down, self.right, self.up
+        if time is not None:
+            left, down, right, up = self._planes_at(time)
+        return left * np.uint8(1) | down * np.uint8(2) | right * np.uint8(4) | up * np.uint8(8)
+
+    # cells holding at least one blizzard
+    def occupancy(self, time: int | None = None) -> np.ndarray:
+        if time is None:
+            return self.left | self.down | self.right | self.up
+        left, down, right, up = self._planes_at(time)
+        return left | down | right | up
+
+    # the planes at the given time, rolled from the initial map
+    def _planes_at(self, time: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        left, down, right, up = self._initial
+        return (np.roll(left, -time, axis=1),
+                np.roll(down, time, axis=0),
+                np.roll(right, time, axis=1),
+                np.roll(up, -time, axis=0))
+
+    def _build_index(self) -> None:
+        super()._build_index()
+        self._initial = (self.left.copy(), self.down.copy(), self.right.copy(), self.up.copy())
+
+    @staticmethod
+    def _plane(planes: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], flag: int) -> np.ndarray:
+        return planes[flag.bit_length() - 1]
+
+    def _toggle_index(self, x: int, y: int, flag: int) -> None:
+        super()._toggle_index(x, y, flag)
+        self._plane(self._initial, flag)[y, x] ^= True
+
+    def _toggle_cell(self, x: int, y: int, flag: int) -> None:
+        self._plane((self.left, self.down, self.right, self.up), flag)[y, x] ^= True
+
+    def is_dead(self, player_x: int, player_y: int) -> bool:
+        return bool(self.dead_cells(np.asarray(player_x), np.asarray(player_y)))
+
+    # vectorised is_dead over arrays of coordinates
+    def dead_cells(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        inside = (ys != -1) & (ys != self.height)
+        dead = np.zeros(np.broadcast(xs, ys).shape, dtype=bool)
+        dead[inside] = self.occupancy()[ys[inside], xs[inside]]
+        return dead
+
+    # move all blizzards
+    def step(self) -> None:
+        self.left = np.roll(self.left, -1, axis=1)
+        self.down = np.roll(self.down, 1, axis=0)
+        self.right = np.roll(self.right, 1, axis=1)
+        self.up = np.roll(self.up, -1, axis=0)
+        self.steps += 1
+
+    def blizzard_cells(self, time: int | None = None) -> list[tuple[int, int, int]]:
+        cells = self.flags(time)
+        ys, xs = np.nonzero(cells)
+        return list(zip(xs.tolist(), ys.tolist(), cells[ys, xs].tolist()))
+
+    def _draw_rows(self, time: int | None = None) -> list[str]:
+        return ["".join(row) for row in SYMBOLS[self.flags(time)].tolist()]
@@ -0,0 +1,180 @@
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+import os
+
+from checkpoint import CheckpointBFS
+from solver import NoSolution
+from state import State
+from world import World
+
+
+# expands the frontier rows start to stop - 1 of every layer, in a worker process
+# the frontier of the current minute is read from one shared buffer and the next one written to the other,
+# so only the rows next to the band are read from the bands of the neighbours.
+# receives (time, buffer index) per layer and answers with the number of cells reached, stops on None
+def _expand_band(world: World,
+                 allowed: list[int],
+                 start: int,
+                 stop: int,
+                 row_bytes: int,
+                 names: tuple[str, str],
+                 connection: Connection) -> None:
+    buffers: list[SharedMemory] = [SharedMemory(name=name) for name in names]
+    rows: int = world.height + 2
+    try:
+        while (message := connection.recv()) is not None:
+            time, current = message
+            source = buffers[current].buf
+            target = buffers[1 - current].buf
+            above: int = int.from_bytes(source[(start - 1) * row_bytes:start * row_bytes], "little") if start > 0 else 0
+            row: int = int.from_bytes(source[start * row_bytes:(start + 1) * row_bytes], "little")
+            reached: int = 0
+            for r in range(start, stop):
+                below: int = int.from_bytes(source[(r + 1) * row_bytes:(r + 2) * row_bytes], "little") \
+                    if r + 1 < rows else 0
+                reach: int = (row | (row << 1) | (row >> 1) | above | below) & allowed[r - start]
+                if 0 < r < rows - 1:
+                    reach &= ~world.blocked_row(r - 1, time)
+                target[r * row_bytes:(r + 1) * row_bytes] = reach.to_bytes(row_bytes, "little")
+                reached += reach.bit_count()
+                above, row = row, below
+            del source, target
+            connection.send(reached)
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+
+# memory for the checkpoints of a search, every layer is kept while they fit
+CHECKPOINT_BYTES: int = 64 << 20
+
+
+# bitset BFS with the rows of every layer split into horizontal bands, expanded by a pool of worker processes.
+# the frontier lives in shared memory, and every worker computes the blizzards of its own rows, so the main
+# process only reads the goal row of every layer, and the whole layer at checkpoints and blizzard periods.
+# like CheckpointBFS, only checkpoints are kept (every layer until they fill checkpoint_bytes, fewer and fewer
+# after that), and the path is rebuilt from them, by the workers too.
+# a single worker expands the layers in the main process instead
+class ParallelBitsetBFS(CheckpointBFS):
+    def __init__(self,
+                world: World,
+                initial_state: State,
+                workers: int | None = None,
+                checkpoint_bytes: int = CHECKPOINT_BYTES) -> None:
+        layer_bytes: int = (world.height + 2) * ((world.width + 7) // 8)
+        super().__init__(world, initial_state, interval=1, max_checkpoints=max(2, checkpoint_bytes // layer_bytes))
+        # no more bands than rows
+        self.workers: int = max(1, min(workers or os.cpu_count() or 1, self.rows))
+        self._buffers: list[SharedMemory] = []
+        self._connections: list[Connection] = []
+        self._processes: list[Process] = []
+        # index of the buffer holding the current layer
+        self._current: int = 0
+
+    # first and last row of every band, the rows are spread as evenly as possible
+    def bands(self) -> list[tuple[int, int]]:
+        size, extra = divmod(self.rows, self.workers)
+        bounds: list[tuple[int, int]] = []
+        start: int = 0
+        for i in range(self.workers):
+            stop: int = start + size + (1 if i < extra else 0)
+            bounds.append((start, stop))
+            start = stop
+        return bounds
+
+    # the workers only run during a search, the walk back included
+    def _run(self, frontier: list[int], goal_row: int, goal_mask: int) -> State | None:
+        if self.workers == 1:
+            return super()._run(frontier, goal_row, goal_mask)
+        self._start_workers()
+        try:
+            start: int = self.initial_state.time
+            time: int = start
+            self._write(frontier, self._current)
+            frontier_size: int = sum(row.bit_count() for row in frontier)
+            while frontier_size:
+                reached: int = self._read_row(self._current, goal_row) & goal_mask
+                if reached:
+                    # the lowest gate reached
+                    return self._recover(time - start, (reached & -reached).bit_length() - 1, goal_row - 1)
+                self.expanded += frontier_size
+                if self.stats is not None:
+                    self.stats.layer(time, frontier_size, frontier_size)
+                time += 1
+                frontier_size = self._advance(time)
+                checkpoint: bool = (time - start) % self._interval == 0
+                if checkpoint or time % self.world.period == 0:
+                    # the shared buffer already holds the layer packed
+                    packed: bytes = bytes(self._buffer(self._current))
+                    if checkpoint:
+                        self._store(time - start, packed)
+                    if time % self.world.period == 0 and self._repeats(time, self._digest(packed)):
+                        return None
+            self.no_solution = NoSolution(time, 0)
+            return None
+        finally:
+            self._stop_workers()
+
+    # has the workers expand the current layer into the other buffer, returns the number of cells reached
+    def _advance(self, time: int) -> int:
+        for connection in self._connections:
+            connection.send((time, self._current))
+        reached: int = sum(connection.recv() for connection in self._connections)
+        self._current = 1 - self._current
+        return reached
+
+    def _expand(self, frontier: list[int], time: int) -> list[int]:
+        if not self._connections:
+            return super()._expand(frontier, time)
+        self._write(frontier, self._current)
+        self._advance(time)
+        return self._read(self._current)
+
+    def _buffer(self, index: int) -> memoryview:
+        buffer: memoryview | None = self._buffers[index].buf
+        if buffer is None:
+            raise RuntimeError("The shared frontier is closed")
+        return buffer
+
+    # the shared memory may be rounded up to a whole page, so only its first rows * row_bytes bytes are used
+    def _write(self, frontier: list[int], index: int) -> None:
+        packed: bytes = self._pack(frontier)
+        self._buffer(index)[:len(packed)] = packed
+
+    def _read(self, index: int) -> list[int]:
+        return self._unpack(bytes(self._buffer(index)[:self.rows * self.row_bytes]))
+
+    def _read_row(self, index: int, r: int) -> int:
+        return int.from_bytes(self._buffer(index)[r * self.row_bytes:(r + 1) * self.row_bytes], "little")
+
+    def _start_workers(self) -> None:
+        size: int = self.rows * self.row_bytes
+        self._buffers = [SharedMemory(create=True, size=size) for _ in range(2)]
+        names: tuple[str, str] = (self._buffers[0].name, self._buffers[1].name)
+        self._current = 0
+        for start, stop in self.bands():
+            parent, child = Pipe()
+            process: Process = Process(target=_expand_band, daemon=True,
+                                       args=(self.world, self.allowed[start:stop], start, stop,
+                                             self.row_bytes, names, child))
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def _stop_workers(self) -> None:
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        for buffer in self._buffers:
+            buffer.close()
+            buffer.unlink()
+        self._connections = []
+        self._processes = []
+        self._buffers = []
@@ -1,51 +1,100 @@
+import mmap
+import os
+
+
+# raised for invalid input, line is the 1-based line number of the problem if it is known
+class ParseError(ValueError):
+    def __init__(self, message: str, line: int | None = None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+
+# byte -> blizzard flags of a map cell, 255 for bytes that are not allowed in the map
+CELL_TABLE: bytes = bytes(
+    {ord("."): 0, ord("<"): 1, ord("v"): 2, ord(">"): 4, ord("^"): 8}.get(i, 255) for i in range(256)
+)
+WALL: int = ord("#")
+GATE: int = ord(".")
+
+
 def parse(input_str: str) -> tuple[list[list[int]], int, int]:
-    input_str = input_str.strip()
-    lines: list[str] = input_str.split("\n")
-    line_length: int = len(lines[0])
-    map_str: list[str] = list(map(lambda x: x.strip("#"), lines[1:-1])) # remove the wall
+    return parse_lines(input_str.strip().encode().split(b"\n"))
+
+
+# parses a file through a memory map, without decoding it to a string first
+def parse_file(file_path: str) -> tuple[list[list[int]], int, int]:
+    return parse_lines(read_lines(file_path))
+
+
+# like parse_file, but the first and last lines may contain several gates
+# returns the map and the x coordinates of all gates in the top and bottom walls
+def parse_file_gates(file_path: str) -> tuple[list[list[int]], list[int], list[int]]:
+    return parse_gate_lines(read_lines(file_path))
 
+
+def read_lines(file_path: str) -> list[bytes]:
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ParseError("File must contain at least three lines.")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            lines: list[bytes] = []
+            start: int = 0
+            while start < len(data):
+                stop: int = data.find(b"\n", start)
+                if stop == -1:
+                    stop = len(data)
+                lines.append(data[start:stop])
+                start = stop + 1
+    # like parse, ignore whitespace around the map
+    while lines and not lines[-1].strip():
+        lines.pop()
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    if lines:
+        lines[0] = lines[0].strip()
+        lines[-1] = lines[-1].strip()
+    return lines
+
+
+def parse_lines(lines: list[bytes]) -> tuple[list[list[int]], int, int]:
+    map_int, entries, exits = _parse_lines(lines, single_gate=True)
+    return map_int, entries[0], exits[0]
+
+
+def parse_gate_lines(lines: list[bytes]) -> tuple[list[list[int]], list[int], list[int]]:
+    return _parse_lines(lines, single_gate=False)
+
+
+# validates and converts all lines in a single pass, rows are translated to blizzard flags byte-wise
+def _parse_lines(lines: list[bytes], single_gate: bool) -> tuple[list[list[int]], list[int], list[int]]:
+    lines = [line.rstrip(b"\r") for line in lines]
     if len(lines) < 3:
-        print("Error: File must contain at least three lines.")
-        quit()
-    if not all(len(line) == line_length for line in lines):
-        print("Error: All lines must be of the same length.")
-        quit()
-    if not all(line.startswith("#") and line.endswith("#") for line in lines):
-        print("Error: All lines must start and end with '#' characters.")
-        quit()
-    if lines[0].count(".") != 1:
-        print("Error: The first line must contain a single '.' character.")
-        quit()
-    if lines[-1].count(".") != 1:
-        print("Error: The last line must contain a single '.' character.")
-        quit()
-    if not all(c == "#" for c in lines[0].replace(".", "")):
-        print("Error: The first line must consist of '.' and '#' characters only.")
-        quit()
-    if not all(c == "#" for c in lines[-1].replace(".", "")):
-        print("Error: The last line must consist of '.' and '#' characters only.")
-        quit()
-    if not all(c in ".<>^v" for line in map_str for c in line):
-        print("Error: Map can only contain '.', '<', '>', '^', and 'v'.")
-        quit()
-
-    entry_x: int = lines[0].index(".") - 1  # y is always -1
-    exit_x: int = lines[-1].index(".") - 1
+        raise ParseError("File must contain at least three lines.")
+    line_length: int = len(lines[0])
 
     map_int: list[list[int]] = []
-    for line in map_str:
-        new_line: list[int] = []
-        for c in line:
-            if c == "<":
-                new_line.append(1)
-            elif c == "v":
-                new_line.append(2)
-            elif c == ">":
-                new_line.append(4)
-            elif c == "^":
-                new_line.append(8)
-            else:
-                new_line.append(0)
-        map_int.append(new_line)
-    
-    return map_int, entry_x, exit_x
\ No newline at end of file
+    for number, line in enumerate(lines, start=1):
+        if len(line) != line_length:
+            raise ParseError("All lines must be of the same length.", number)
+        if line_length < 2 or line[0] != WALL or line[-1] != WALL:
+            raise ParseError("All lines must start and end with '#' characters.", number)
+        if number == 1 or number == len(lines):
+            position: str = "first" if number == 1 else "last"
+            if single_gate and line.count(b".") != 1:
+                raise ParseError(f"The {position} line must contain a single '.' character.", number)
+            if line.count(b".") == 0:
+                raise ParseError(f"The {position} line must contain at least one '.' character.", number)
+            if line.translate(None, b"#."):
+                raise ParseError(f"The {position} line must consist of '.' and '#' characters only.", number)
+            continue
+        row: bytes = line[1:-1].translate(CELL_TABLE)
+        if 255 in row:
+            raise ParseError("Map can only contain '.', '<', '>', '^', and 'v'.", number)
+        map_int.append(list(row))
+
+    # y is always -1 for the entries and height for the exits
+    entries: list[int] = [x - 1 for x, c in enumerate(lines[0]) if c == GATE]
+    exits: list[int] = [x - 1 for x, c in enumerate(lines[-1]) if c == GATE]
+
+    return map_int, entries, exits
@@ -0,0 +1,64 @@
+from collections.abc import Iterable
+import sys
+from typing import BinaryIO
+
+from state import State
+from world import World
+
+
+BUFFER_SIZE = 1 << 20
+
+
+# opens the file, or stdout if no file is given, as a binary stream with a large buffer
+def open_output(file_path: str | None = None) -> BinaryIO:
+    if file_path is None:
+        sys.stdout.flush()
+        return open(sys.stdout.fileno(), "wb", buffering=BUFFER_SIZE, closefd=False)
+    return open(file_path, "wb", buffering=BUFFER_SIZE)
+
+
+# writes the frames of a solution as text, in the format of World.draw
+# every writes only every Nth frame (the last frame is always written), and diff writes only the lines that
+# changed since the last frame written, each as "<line index>:<line>", after the first full frame
+class ReplayWriter:
+    def __init__(self,
+                world: World,
+                stream: BinaryIO,
+                every: int = 1,
+                diff: bool = False) -> None:
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.world = world
+        self.stream = stream
+        self.every = every
+        self.diff = diff
+        self.frames: int = 0
+        self._last: list[str] | None = None
+
+    def write(self, state: State) -> None:
+        frame: str = self.world.draw(state.player_x, state.player_y, state.time)
+        if not self.diff or self._last is None:
+            text: str = f"Step {state.time}:\n{frame}\n"
+        else:
+            lines: list[str] = frame.split("\n")
+            changed: list[str] = [f"{i}:{line}" for i, (line, last) in enumerate(zip(lines, self._last))
+                                  if line != last]
+            text = f"Step {state.time}:\n" + "".join(line + "\n" for line in changed) + "\n"
+        if self.diff:
+            self._last = frame.split("\n")
+        self.stream.write(text.encode())
+        self.frames += 1
+
+    # writes the selected frames of the solution, returns the number of frames written
+    def write_all(self, solution: Iterable[State]) -> int:
+        previous: State | None = None
+        for i, state in enumerate(solution):
+            if i % self.every == 0:
+                self.write(state)
+                previous = None
+            else:
+                previous = state
+        if previous is not None:
+            self.write(previous)
+        self.stream.flush()
+        return self.frames
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+import json
+import os
+import socketserver
+import stat
+import time
+from typing import TextIO
+
+from api import NoSolutionError, Solution, itinerary_name, load_world, parse_world, solve
+from cache import SolutionCache
+from parser import ParseError
+from world import World
+
+
+# parsed worlds kept in memory, the least recently used ones are dropped beyond it
+MAX_WORLDS: int = 256
+
+
+# a world kept in memory, with the solutions found on it so far by itinerary and algorithm
+class _Entry:
+    def __init__(self, world: World) -> None:
+        self.world = world
+        self.solutions: dict[tuple[str, str], Solution | NoSolutionError] = {}
+
+
+# answers solve requests, one JSON object per line, keeping the worlds it parsed and their solutions in memory.
+# a request names a "file" (reloaded when it changes) or holds the "map" itself, and can set "algorithm",
+# "part1", "legs", "gates" and "path" (to include the positions of the solution) like the command line, and
+# an "id" that is copied to the answer. the answer has a "status" of "ok", "no_solution" or "error".
+# solutions in memory are kept per algorithm, those of the on-disk cache are shared by all algorithms like on the
+# command line
+class SolveServer:
+    def __init__(self,
+                 cache: SolutionCache | None = None,
+                 workers: int | None = None,
+                 max_worlds: int = MAX_WORLDS) -> None:
+        self.cache = cache
+        self.workers = workers
+        self.max_worlds = max_worlds
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+
+    # the world of the request, parsed only if it is not in memory yet
+    def _entry(self, request: dict) -> _Entry:
+        gates: bool = bool(request.get("gates", False))
+        key: tuple
+        if "file" in request:
+            # a file is parsed again when it is modified
+            status: os.stat_result = os.stat(request["file"])
+            key = ("file", request["file"], status.st_mtime_ns, status.st_size, gates)
+        elif "map" in request:
+            key = ("map", request["map"], gates)
+        else:
+            raise ValueError("A request needs a 'file' or a 'map'")
+
+        entry: _Entry | None = self._entries.get(key)
+        if entry is None:
+            world: World = load_world(request["file"], gates) if "file" in request else parse_world(request["map"], gates)
+            if self.cache is not None:
+                world.occupancy_table = self.cache.occupancy(world)
+            entry = _Entry(world)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_worlds:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return entry
+
+    def handle(self, request: dict) -> dict:
+        answer: dict = {"id": request.get("id"), "status": "ok"}
+        start: float = time.perf_counter()
+        try:
+            entry: _Entry = self._entry(request)
+            part1_only: bool = bool(request.get("part1", False))
+            legs: int | None = request.get("legs")
+            algorithm: str = request.get("algorithm", "bfs")
+            # the algorithms agree on the steps but not always on the path, or on the solvers of the solution
+            # (the workers only change how fast it is found)
+            name: tuple[str, str] = (itinerary_name(part1_only, legs), algorithm)
+            solution: Solution | NoSolutionError | None = entry.solutions.get(name)
+            if solution is None:
+                try:
+                    solution = solve(entry.world, algorithm, part1_only, legs, self.workers, self.cache)
+                except NoSolutionError as e:
+                    solution = e
+                entry.solutions[name] = solution
+            if isinstance(solution, NoSolutionError):
+                answer.update(status="no_solution", phase=solution.phase, error=solution.message)
+            else:
+                answer.update(steps=solution.steps, phases=solution.phases)
+                if request.get("path", False):
+                    answer["path"] = [[state.player_x, state.player_y] for state in solution.path()]
+        except ParseError as e:
+            answer.update(status="error", error=e.message, line=e.line)
+        except FileNotFoundError as e:
+            answer.update(status="error", error=f"File '{e.filename}' not found")
+        except Exception as e:
+            answer.update(status="error", error=str(e))
+        answer["wall_time"] = time.perf_counter() - start
+        return answer
+
+    # answers a single line, as a single line
+    def handle_line(self, line: str) -> str:
+        try:
+            request: dict = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+        except ValueError as e:
+            return json.dumps({"id": None, "status": "error", "error": f"Invalid request: {e}"})
+        return json.dumps(self.handle(request))
+
+    # answers every line of the input until it ends
+    def serve_stream(self, input: TextIO, output: TextIO) -> None:
+        for line in input:
+            if line.strip():
+                output.write(self.handle_line(line) + "\n")
+                output.flush()
+
+    # answers the connections to a Unix socket at the given path one at a time, until interrupted
+    def serve_socket(self, socket_path: str) -> None:
+        server: SolveServer = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write((server.handle_line(line.decode()) + "\n").encode())
+                        self.wfile.flush()
+
+        # a socket left by an earlier server is replaced, any other file is kept
+        try:
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise ValueError(f"'{socket_path}' exists and is not a socket")
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+        with socketserver.UnixStreamServer(socket_path, Handler) as unix_server:
+            created: os.stat_result = os.stat(socket_path)
+            try:
+                unix_server.serve_forever()
+            finally:
+                # unless another server has replaced it since
+                if _same_file(socket_path, created):
+                    os.remove(socket_path)
+
+
+def _same_file(path: str, status: os.stat_result) -> bool:
+    try:
+        current: os.stat_result = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return (current.st_dev, current.st_ino) == (status.st_dev, status.st_ino)
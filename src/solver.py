@@ -1,8 +1,65 @@
 from abc import ABC, abstractmethod
+from collections.abc import Hashable
+from dataclasses import dataclass
+from time import perf_counter
 from state import State
+from stats import SolverStats
+from world import World
+
+# proof that a search cannot succeed: the cells reachable at the given time were already reachable
+# cycle_length steps earlier, at the same point of the blizzard cycle, so the search would only repeat itself.
+# a cycle_length of 0 means that the search ran out of states instead
+@dataclass(frozen=True)
+class NoSolution:
+    time: int
+    cycle_length: int
+
+    def __str__(self) -> str:
+        if self.cycle_length == 0:
+            return f"no states are left to search after minute {self.time}"
+        return f"the cells reachable at minute {self.time} were already reachable at minute {self.time - self.cycle_length}"
+
 
 class Solver(ABC):
+    world: World
+    # number of states expanded by the last solve, for comparing algorithms
+    expanded: int = 0
+    # optional instrumentation, the solvers only touch it once per time layer when it is set
+    stats: SolverStats | None = None
+    # set when solve returns None
+    no_solution: NoSolution | None = None
+    # reachable cells at the start of every blizzard cycle, see _repeats
+    _snapshots: dict[Hashable, int]
+
     # returns the final state if a solution is found, otherwise None
     @abstractmethod
     def solve(self, forward: bool) -> State | None:
-        return None
\ No newline at end of file
+        return None
+
+    # called with the reachable cells at times that are a multiple of world.period, returns True if they repeat
+    # since the blizzards are back at their initial positions, the search would repeat itself from there
+    def _repeats(self, time: int, reachable: Hashable) -> bool:
+        seen: int | None = self._snapshots.get(reachable)
+        if seen is not None:
+            self.no_solution = NoSolution(time, time - seen)
+            return True
+        self._snapshots[reachable] = time
+        return False
+
+    # the blizzard rows of the given time, counted as simulation time when stats are enabled
+    def _blocked_rows(self, time: int) -> list[int]:
+        if self.stats is None:
+            return [self.world.blocked_row(y, time) for y in range(self.world.height)]
+        start: float = perf_counter()
+        rows: list[int] = [self.world.blocked_row(y, time) for y in range(self.world.height)]
+        self.stats.simulation_time += perf_counter() - start
+        return rows
+
+
+def no_solution_message(phase: str | None, solver: Solver) -> str:
+    message: str = "No solution found"
+    if phase is not None:
+        message += f" in phase {phase}"
+    if solver.no_solution is not None:
+        message += f": {solver.no_solution}"
+    return message + "."
@@ -0,0 +1,34 @@
+from solver import Solver
+from bfs import BFS
+from bitset import BitsetBFS
+from astar import AStar
+from compact import CompactBFS
+from checkpoint import CheckpointBFS
+from parallel import ParallelBitsetBFS
+from incremental import IncrementalBFS
+from state import State
+from world import World
+
+
+ALGORITHMS: tuple[str, ...] = ("bfs", "bitset", "astar", "compact", "parallel", "checkpoint", "incremental")
+
+
+# workers is only used by the parallel solver, None uses one per CPU
+def choose_solver(algorithm: str, world: World, state0: State, workers: int | None = None) -> Solver:
+    match algorithm:
+        case "bfs":
+            return BFS(world, state0)
+        case "bitset":
+            return BitsetBFS(world, state0)
+        case "astar":
+            return AStar(world, state0)
+        case "compact":
+            return CompactBFS(world, state0)
+        case "checkpoint":
+            return CheckpointBFS(world, state0)
+        case "incremental":
+            return IncrementalBFS(world, state0)
+        case "parallel":
+            return ParallelBitsetBFS(world, state0, workers)
+        case _:
+            raise ValueError(f"Invalid algorithm identifier '{algorithm}'")
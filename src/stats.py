@@ -0,0 +1,56 @@
+from collections.abc import Callable
+import json
+
+
+# counters filled in by a solver while it runs, see Solver.stats
+class SolverStats:
+    def __init__(self,
+                on_layer: Callable[[int, int, int], None] | None = None) -> None:
+        self.layers: int = 0
+        self.peak_frontier: int = 0
+        self.peak_visited: int = 0
+        # time spent computing blizzard positions, the rest of the solve is spent on the search itself
+        self.simulation_time: float = 0.0
+        # called with the time, frontier size and visited size of every layer
+        self.on_layer = on_layer
+
+    # called by the solvers once per time layer
+    def layer(self, time: int, frontier: int, visited: int) -> None:
+        self.layers += 1
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        if visited > self.peak_visited:
+            self.peak_visited = visited
+        if self.on_layer is not None:
+            self.on_layer(time, frontier, visited)
+
+    def report(self, phase: str, expanded: int, wall_time: float, peak_memory: int | None) -> dict:
+        return {
+            "phase": phase,
+            "wall_time": wall_time,
+            "simulation_time": self.simulation_time,
+            "search_time": max(wall_time - self.simulation_time, 0.0),
+            "expanded": expanded,
+            "layers": self.layers,
+            "peak_frontier": self.peak_frontier,
+            "peak_visited": self.peak_visited,
+            "peak_memory": peak_memory,
+        }
+
+
+def format_reports(reports: list[dict], output_format: str = "text") -> str:
+    if output_format == "json":
+        return json.dumps(reports)
+    lines: list[str] = []
+    for report in reports:
+        lines.append(f"Phase {report['phase']}:")
+        lines.append(f"  wall time:       {report['wall_time']:.4f}s")
+        lines.append(f"  simulation time: {report['simulation_time']:.4f}s")
+        lines.append(f"  search time:     {report['search_time']:.4f}s")
+        lines.append(f"  nodes expanded:  {report['expanded']}")
+        lines.append(f"  time layers:     {report['layers']}")
+        lines.append(f"  peak frontier:   {report['peak_frontier']}")
+        lines.append(f"  peak visited:    {report['peak_visited']}")
+        if report["peak_memory"] is not None:
+            lines.append(f"  peak memory:     {report['peak_memory'] / 1024:.1f} KiB")
+    return "\n".join(lines)
@@ -1,20 +1,95 @@
+from array import array
+from collections.abc import Iterable
+from math import lcm
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # cache imports world
+    from cache import OccupancyTable
+
+
+# blizzard flag of each direction symbol
+DIRECTIONS: dict[str, int] = {"<": 1, "v": 2, ">": 4, "^": 8}
+
+# symbol of each combination of blizzard flags, as drawn by draw: the direction, or the number of blizzards
+SYMBOL_TABLE: bytes = b".<v2>223^2232334" + bytes(240)
+# "0" and "1" characters of a binary string -> 0 and 1 bytes
+BIT_BYTES: bytes = bytes.maketrans(b"01", b"\x00\x01")
+
+# moves in the order the solvers try them, as symbols and as offsets
+MOVES: tuple[str, ...] = ("", "<", "v", ">", "^")
+MOVE_OFFSETS: tuple[tuple[int, int], ...] = ((0, 0), (-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+# the cells reachable from every cell in one step, waiting included, over integer cell ids.
+# cell ids cover the entry row (y = -1) to the exit row (y = height) as (y + 1) * width + x.
+# in CSR form: the successors of cell c are neighbours[start[c]:start[c + 1]], and moves holds the index
+# in MOVES of each of them. xs and ys are the position of every cell id
+class NeighbourTable:
+    def __init__(self, width: int, height: int, entries: frozenset[int], exits: frozenset[int]) -> None:
+        self.width = width
+        self.start: array = array("i", [0])
+        self.neighbours: array = array("i")
+        self.moves: array = array("b")
+        self.xs: array = array("i")
+        self.ys: array = array("i")
+        for cell in range((height + 2) * width):
+            x, y = cell % width, cell // width - 1
+            self.xs.append(x)
+            self.ys.append(y)
+            # walls of the entry and exit rows have no successors
+            if 0 <= y < height or (y == -1 and x in entries) or (y == height and x in exits):
+                for move, (dx, dy) in enumerate(MOVE_OFFSETS):
+                    next_x: int = x + dx
+                    next_y: int = y + dy
+                    if next_x < 0 or next_x >= width or next_y < -1 or next_y > height:
+                        continue
+                    if next_y == -1 and next_x not in entries:
+                        continue
+                    if next_y == height and next_x not in exits:
+                        continue
+                    self.neighbours.append(cell + dy * width + dx)
+                    self.moves.append(move)
+            self.start.append(len(self.neighbours))
+
+
 class World:
     def __init__(self,
                 map: list[list[int]] = [[0]],
                 entry_x: int = 0,
-                exit_x: int = 0,) -> None:
+                exit_x: int = 0,
+                entries: Iterable[int] = (),
+                exits: Iterable[int] = ()) -> None:
         if not self._validate_map(map):
             raise ValueError("Invalid map format")
         if entry_x < 0 or entry_x >= len(map[0]):
             raise ValueError("entry_x must be within the map width")
         if exit_x < 0 or exit_x >= len(map[0]):
             raise ValueError("exit_y must be within the map height")
+        # gates in the top and bottom walls, entry_x and exit_x are always among them
+        entries = frozenset(entries) | {entry_x}
+        exits = frozenset(exits) | {exit_x}
+        if any(x < 0 or x >= len(map[0]) for x in entries | exits):
+            raise ValueError("All gates must be within the map width")
 
         self.width = len(map[0])
         self.height = len(map)
         self.map = map
         self.entry_x = entry_x
         self.exit_x = exit_x
+        self.entries: frozenset[int] = entries
+        self.exits: frozenset[int] = exits
+        # the blizzards return to their initial positions after this many steps
+        self.period = lcm(self.width, self.height)
+        # number of calls to step, i.e. the time of map
+        self.steps: int = 0
+        # every blizzard added or removed so far, as (x, y, flag) on the initial map
+        self.edits: list[tuple[int, int, int]] = []
+        # built on first use, the gates never change
+        self._neighbour_table: NeighbourTable | None = None
+        # optional precomputed blocked rows of a whole period, e.g. a memory-mapped cache.OccupancyTable
+        self.occupancy_table: "OccupancyTable | None" = None
+        self._build_index()
 
     def _validate_map(self, map: list[list[int]]) -> bool:
         if not isinstance(map, list):
@@ -33,19 +108,88 @@ class World:
                     return False
         return True
     
+    # index the blizzards of the initial map, so occupancy can be queried for any time
+    # rows hold the horizontal blizzards ('<', '>') as bitmasks over x,
+    # columns hold the vertical blizzards ('v', '^') as bitmasks over y.
+    # vertical blizzards are also kept as row bitmasks, since a whole row of them moves together
+    def _build_index(self) -> None:
+        self._left_rows: list[int] = [0] * self.height
+        self._right_rows: list[int] = [0] * self.height
+        self._down_rows: list[int] = [0] * self.height
+        self._up_rows: list[int] = [0] * self.height
+        self._down_cols: list[int] = [0] * self.width
+        self._up_cols: list[int] = [0] * self.width
+        self._full_row: int = (1 << self.width) - 1
+
+        cells: list[list[int]] = self.map
+        for j in range(self.height):
+            for i in range(self.width):
+                if cells[j][i] & 1:  # '<'
+                    self._left_rows[j] |= 1 << i
+                if cells[j][i] & 2:  # 'v'
+                    self._down_rows[j] |= 1 << i
+                    self._down_cols[i] |= 1 << j
+                if cells[j][i] & 4:  # '>'
+                    self._right_rows[j] |= 1 << i
+                if cells[j][i] & 8:  # '^'
+                    self._up_rows[j] |= 1 << i
+                    self._up_cols[i] |= 1 << j
+
+    # bitmask over x of the cells in row y that hold a blizzard at the given time
+    def blocked_row(self, player_y: int, time: int) -> int:
+        if self.occupancy_table is not None:
+            return self.occupancy_table.blocked_row(player_y, time)
+        shift: int = time % self.width
+        left: int = self._left_rows[player_y]
+        right: int = self._right_rows[player_y]
+        # '<' rotates towards bit 0, '>' towards the highest bit
+        left = (left >> shift) | (left << (self.width - shift))
+        right = (right << shift) | (right >> (self.width - shift))
+        return ((left | right) & self._full_row) \
+            | self._down_rows[(player_y - time) % self.height] \
+            | self._up_rows[(player_y + time) % self.height]
+
+    # blizzard flags of a cell at the given time, counted from the map the world was created with
+    # a blizzard moving left is at x at time t if it started at x + t (with wraparound), etc.
+    def cell_at(self, player_x: int, player_y: int, time: int) -> int:
+        cell: int = 0
+        if self._left_rows[player_y] >> ((player_x + time) % self.width) & 1:
+            cell |= 1
+        if self._down_cols[player_x] >> ((player_y - time) % self.height) & 1:
+            cell |= 2
+        if self._right_rows[player_y] >> ((player_x - time) % self.width) & 1:
+            cell |= 4
+        if self._up_cols[player_x] >> ((player_y + time) % self.height) & 1:
+            cell |= 8
+        return cell
+
+    # player would be standing in a blizzard at the given time, without stepping the map
+    def is_blocked_at(self, player_x: int, player_y: int, time: int) -> bool:
+        if player_y == -1 or player_y == self.height:
+            return False
+        if self._left_rows[player_y] >> ((player_x + time) % self.width) & 1:
+            return True
+        if self._right_rows[player_y] >> ((player_x - time) % self.width) & 1:
+            return True
+        if self._down_cols[player_x] >> ((player_y - time) % self.height) & 1:
+            return True
+        if self._up_cols[player_x] >> ((player_y + time) % self.height) & 1:
+            return True
+        return False
+
     # player is standing in a blizzard
     def is_dead(self, player_x: int, player_y:int) -> bool:
         if player_y != -1 and player_y != self.height and self.map[player_y][player_x] != 0:
             return True
         return False
     
-    # player is at the exit (i.e. beyond the last row)
+    # player is at an exit (i.e. beyond the last row), or at an entry if not forward
     def is_solved(self, player_x: int, player_y: int, forward: bool = True) -> bool:
         if forward:
-            if player_x == self.exit_x and player_y == self.height:
+            if player_y == self.height and player_x in self.exits:
                 return True
         else:
-            if player_x == self.entry_x and player_y == -1:
+            if player_y == -1 and player_x in self.entries:
                 return True
         return False
     
@@ -65,90 +209,151 @@ class World:
                     new_map[self.height - 1 if j == 0 else j - 1][i] |= 8
         
         self.map = new_map
+        self.steps += 1
+
+    # edits of the blizzards, which apply to the whole run: a blizzard is given by its position at the given
+    # time (the initial map by default), and is added or removed at every time along its path
+    def add_blizzard(self, player_x: int, player_y: int, direction: str, time: int = 0) -> None:
+        self._edit(player_x, player_y, DIRECTIONS[direction], time, True)
+
+    def remove_blizzard(self, player_x: int, player_y: int, direction: str, time: int = 0) -> None:
+        self._edit(player_x, player_y, DIRECTIONS[direction], time, False)
+
+    # both edits are checked before either is made, so a failed redirect leaves the world unchanged
+    def redirect_blizzard(self, player_x: int, player_y: int, direction: str, new_direction: str, time: int = 0) -> None:
+        flag: int = DIRECTIONS[direction]
+        new_flag: int = DIRECTIONS[new_direction]
+        origin: tuple[int, int] = self._edit_origin(player_x, player_y, flag, time, False)
+        # turning a blizzard into itself adds back the one it removes
+        new_origin: tuple[int, int] = origin if new_flag == flag else \
+            self._edit_origin(player_x, player_y, new_flag, time, True)
+        self._toggle(*origin, flag)
+        self._toggle(*new_origin, new_flag)
+
+    # initial position of the blizzard with the given flag that is at x, y at the given time
+    # with a negative time, this is its position at -time instead
+    def blizzard_origin(self, player_x: int, player_y: int, flag: int, time: int) -> tuple[int, int]:
+        match flag:
+            case 1:  # '<'
+                return (player_x + time) % self.width, player_y
+            case 2:  # 'v'
+                return player_x, (player_y - time) % self.height
+            case 4:  # '>'
+                return (player_x - time) % self.width, player_y
+            case _:  # '^'
+                return player_x, (player_y + time) % self.height
+
+    def _edit(self, player_x: int, player_y: int, flag: int, time: int, add: bool) -> None:
+        self._toggle(*self._edit_origin(player_x, player_y, flag, time, add), flag)
+
+    # initial position of the blizzard to add or remove, if the edit is possible
+    def _edit_origin(self, player_x: int, player_y: int, flag: int, time: int, add: bool) -> tuple[int, int]:
+        if player_x < 0 or player_x >= self.width or player_y < 0 or player_y >= self.height:
+            raise ValueError("Blizzards must be within the map")
+        x, y = self.blizzard_origin(player_x, player_y, flag, time)
+        if bool(self.cell_at(x, y, 0) & flag) == add:
+            raise ValueError("There is already such a blizzard" if add else "There is no such blizzard")
+        return x, y
+
+    # adds or removes the blizzard with the given flag and initial position
+    def _toggle(self, x: int, y: int, flag: int) -> None:
+        # the precomputed rows are those of the map before the edit
+        self.occupancy_table = None
+        self._toggle_index(x, y, flag)
+        self._toggle_cell(*self.blizzard_origin(x, y, flag, -self.steps), flag)
+        self.edits.append((x, y, flag))
+
+    # adds or removes a blizzard of the initial map
+    def _toggle_index(self, x: int, y: int, flag: int) -> None:
+        match flag:
+            case 1:
+                self._left_rows[y] ^= 1 << x
+            case 2:
+                self._down_rows[y] ^= 1 << x
+                self._down_cols[x] ^= 1 << y
+            case 4:
+                self._right_rows[y] ^= 1 << x
+            case _:
+                self._up_rows[y] ^= 1 << x
+                self._up_cols[x] ^= 1 << y
+
+    # adds or removes a blizzard of the current map
+    def _toggle_cell(self, x: int, y: int, flag: int) -> None:
+        self.map[y][x] ^= flag
     
-    # return all possible moves the player can make
+    def cell_id(self, player_x: int, player_y: int) -> int:
+        return (player_y + 1) * self.width + player_x
+
+    def neighbour_table(self) -> NeighbourTable:
+        if self._neighbour_table is None:
+            self._neighbour_table = NeighbourTable(self.width, self.height, self.entries, self.exits)
+        return self._neighbour_table
+
+    # return all possible moves the player can make, as symbols
+    # the solvers use the neighbour table directly, this is for showing moves
     def legal_moves(self, player_x: int, player_y: int) -> list[str]:
-        moves: list[str] = []
-
-        for move in ["", "<", "v", ">", "^"]:
-            new_player_x: int = player_x
-            new_player_y: int = player_y
-            match move:
-                case "<":
-                    new_player_x -= 1
-                case "v":
-                    new_player_y += 1
-                case ">":
-                    new_player_x += 1
-                case "^":
-                    new_player_y -= 1
-                case _:
-                    pass
-
-            if new_player_x < 0 or new_player_x >= self.width:
-                continue
-            if new_player_y < -1 or new_player_y > self.height:
-                continue
-            if new_player_y == -1 and new_player_x != self.entry_x:
-                continue
-            if new_player_y == self.height and new_player_x != self.exit_x:
+        table: NeighbourTable = self.neighbour_table()
+        cell: int = self.cell_id(player_x, player_y)
+        return [MOVES[table.moves[i]] for i in range(table.start[cell], table.start[cell + 1])]
+
+    # all cells holding at least one blizzard, as (x, y, flags)
+    def blizzard_cells(self, time: int | None = None) -> list[tuple[int, int, int]]:
+        cells: list[tuple[int, int, int]] = []
+        for i in range(self.height):
+            if time is not None:
+                # only the occupied cells of the row are looked up
+                blocked: int = self.blocked_row(i, time)
+                while blocked:
+                    j: int = (blocked & -blocked).bit_length() - 1
+                    cells.append((j, i, self.cell_at(j, i, time)))
+                    blocked &= blocked - 1
                 continue
+            for j in range(self.width):
+                cell: int = self.map[i][j]
+                if cell != 0:
+                    cells.append((j, i, cell))
+        return cells
 
-            moves.append(move)
-        return moves
+    # draws the current map, or the map at the given time if one is passed
+    def draw(self, player_x: int = 0, player_y: int = -1, time: int | None = None) -> str:
+        rows: list[str] = self._draw_rows(time)
+        if 0 <= player_y < self.height and 0 <= player_x < self.width:
+            line: str = rows[player_y]
+            symbol: str = "E" if line[player_x] == "." else "X"
+            rows[player_y] = line[:player_x] + symbol + line[player_x + 1:]
 
-    def draw(self, player_x: int = 0, player_y: int = -1) -> str:
-        result: str = ""
+        top: str = self._draw_border(self.entries, player_x if player_y == -1 else None)
+        bottom: str = self._draw_border(self.exits, player_x if player_y == self.height else None)
+        return "\n".join([top, *["#" + row + "#" for row in rows], bottom, ""])
 
-        # top border
-        for i in range(self.width + 2):
-            if i == self.entry_x + 1:
-                if player_y == -1:
-                    result += "E"
-                else:
-                    result += "."
-            else:
-                result += "#"
-        result += "\n"
+    # top or bottom wall, with the player drawn on the gate they are standing on
+    def _draw_border(self, gates: frozenset[int], player_x: int | None) -> str:
+        border: bytearray = bytearray(b"#" * (self.width + 2))
+        for x in gates:
+            border[x + 1] = ord("E") if x == player_x else ord(".")
+        return border.decode()
 
-        for i in range(self.height):
-            line: str = ""
-            for j in range(self.width):
-                symbol: str = ""
-                blizzard_count: int = 0
-                if self.map[i][j] == 0:
-                    symbol = "."
-                if self.map[i][j] & 1:
-                    symbol = "<"
-                    blizzard_count += 1
-                if self.map[i][j] & 2:
-                    symbol = "v"
-                    blizzard_count += 1
-                if self.map[i][j] & 4:
-                    symbol = ">"
-                    blizzard_count += 1
-                if self.map[i][j] & 8:
-                    symbol = "^"
-                    blizzard_count += 1
-                if blizzard_count > 1:
-                    symbol = str(blizzard_count)
-                if i == player_y and j == player_x:
-                    if blizzard_count > 0:
-                        symbol = "X"
-                    else:
-                        symbol = "E"
-                line += symbol
-            result += "#" + line + "#\n"
-
-        # bottom border
-        for i in range(self.width + 2):
-            if i == self.exit_x + 1:
-                if player_y == self.height:
-                    result += "E"
-                else:
-                    result += "."
-            else:
-                result += "#"
-        result += "\n"
-
-        return result
\ No newline at end of file
+    # one string of blizzard symbols per row, without the player
+    def _draw_rows(self, time: int | None = None) -> list[str]:
+        if time is None:
+            return [bytes(row).translate(SYMBOL_TABLE).decode() for row in self.map]
+        return [self.row_flags(y, time).translate(SYMBOL_TABLE).decode() for y in range(self.height)]
+
+    # blizzard flags of every cell in row y at the given time, one byte per cell
+    # each direction's bitmask is spread to one byte per bit, so the four can be added as integers without carries
+    def row_flags(self, player_y: int, time: int) -> bytes:
+        shift: int = time % self.width
+        left: int = self._left_rows[player_y]
+        right: int = self._right_rows[player_y]
+        left = ((left >> shift) | (left << (self.width - shift))) & self._full_row
+        right = ((right << shift) | (right >> (self.width - shift))) & self._full_row
+        down: int = self._down_rows[(player_y - time) % self.height]
+        up: int = self._up_rows[(player_y + time) % self.height]
+
+        flags: int = 0
+        for mask, flag in ((left, 1), (down, 2), (right, 4), (up, 8)):
+            if mask:
+                # the binary string starts with the highest bit, which becomes the most significant byte
+                spread: bytes = format(mask, f"0{self.width}b").encode().translate(BIT_BYTES)
+                flags += flag * int.from_bytes(spread, "big")
+        return flags.to_bytes(self.width, "little")
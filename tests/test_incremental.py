@@ -0,0 +1,98 @@
+import os
+import sys
+# the tests import the modules in src directly, like python ./src does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from api import NoSolutionError, Solution, load_world, resolve, solve
+from incremental import IncrementalBFS
+from state import State
+from world import DIRECTIONS, World
+
+import unittest
+
+
+SAMPLE: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "small.txt")
+
+
+def positions(solution: Solution) -> list[tuple[int, int, int]]:
+    return [(state.player_x, state.player_y, state.time) for state in solution.path()]
+
+
+# adds the blizzard, or removes it if it is already there
+def toggle(world: World, x: int, y: int, direction: str, time: int) -> None:
+    if world.cell_at(x, y, time) & DIRECTIONS[direction]:
+        world.remove_blizzard(x, y, direction, time)
+    else:
+        world.add_blizzard(x, y, direction, time)
+
+
+class ResolveTest(unittest.TestCase):
+    # the solution solved again after the edits, and the solution of a world loaded with the same edits
+    def resolve_after(self, edits: list[tuple[int, int, str, int]]) -> tuple[Solution, Solution, Solution]:
+        world: World = load_world(SAMPLE)
+        previous: Solution = solve(world, "incremental")
+        fresh: World = load_world(SAMPLE)
+        for x, y, direction, time in edits:
+            toggle(world, x, y, direction, time)
+            toggle(fresh, x, y, direction, time)
+        return previous, resolve(world, previous), solve(fresh, "bitset")
+
+    def test_matches_a_full_solve(self) -> None:
+        for edits in ([(0, 1, ">", 3)], [(2, 1, "<", 5), (4, 3, "^", 12)], [(3, 2, "v", 9)], [(2, 0, ">", 25)]):
+            _, solution, expected = self.resolve_after(edits)
+            self.assertEqual(solution.phases, expected.phases)
+            self.assertEqual(positions(solution), positions(expected))
+
+    def test_reuses_the_layers_before_the_edit(self) -> None:
+        previous, solution, _ = self.resolve_after([(1, 3, "<", 14)])
+        for solver, previous_solver in zip(solution.solvers, previous.solvers):
+            self.assertIs(solver, previous_solver)
+            assert isinstance(solver, IncrementalBFS)
+            self.assertGreater(solver.reused, 0)
+
+    def test_without_edits(self) -> None:
+        world: World = load_world(SAMPLE)
+        previous: Solution = solve(world, "incremental")
+        solution: Solution = resolve(world, previous)
+        self.assertEqual(positions(solution), positions(previous))
+        self.assertEqual([solver.expanded for solver in solution.solvers], [0, 0, 0])
+
+    def test_no_solution(self) -> None:
+        world: World = load_world(SAMPLE)
+        previous: Solution = solve(world, "incremental", part1_only=True)
+        # a blizzard going down on the cell below the entry at every minute
+        for time in range(world.height):
+            if not world.cell_at(world.entry_x, 0, time) & DIRECTIONS["v"]:
+                world.add_blizzard(world.entry_x, 0, "v", time)
+        with self.assertRaises(NoSolutionError):
+            resolve(world, previous)
+
+    def test_requires_the_incremental_algorithm(self) -> None:
+        world: World = load_world(SAMPLE)
+        with self.assertRaises(ValueError):
+            resolve(world, solve(world, "bitset"))
+        with self.assertRaises(ValueError):
+            resolve(world, Solution([0], State(), cached=True))
+
+
+class EditTest(unittest.TestCase):
+    def test_failed_redirect_leaves_the_world_unchanged(self) -> None:
+        world: World = load_world(SAMPLE)
+        world.add_blizzard(0, 0, "<")
+        cells: list[list[int]] = [[world.cell_at(x, y, 0) for x in range(world.width)] for y in range(world.height)]
+        with self.assertRaises(ValueError):
+            world.redirect_blizzard(0, 0, ">", "<")
+        self.assertTrue(world.cell_at(0, 0, 0) & DIRECTIONS[">"])
+        self.assertEqual(len(world.edits), 1)
+        self.assertEqual([[world.cell_at(x, y, 0) for x in range(world.width)] for y in range(world.height)], cells)
+
+    def test_redirect(self) -> None:
+        world: World = load_world(SAMPLE)
+        world.redirect_blizzard(0, 0, ">", "v")
+        self.assertEqual(world.cell_at(0, 0, 0), DIRECTIONS["v"])
+        self.assertEqual(world.cell_at(1, 0, 1) & DIRECTIONS[">"], 0)
+        self.assertTrue(world.cell_at(0, 1, 1) & DIRECTIONS["v"])
+
+
+if __name__ == "__main__":
+    unittest.main()